@@ -3,3 +3,13 @@ from .validator import (
     SolutionValue as SolutionValue,
 )
 from .solver import Solver as Solver
+from .parallel import solve_parallel as solve_parallel
+from .portfolio import (
+    SolverConfig as SolverConfig,
+    solve_portfolio as solve_portfolio,
+)
+from .stats import (
+    RuleStats as RuleStats,
+    SolverStats as SolverStats,
+)
+from .worklist import WorkPolicy as WorkPolicy
@@ -0,0 +1,137 @@
+import typing
+from solver import model
+from . import conflicts, positions
+
+
+# A line set by a sweep, along with the vertex whose rule set it
+SweptLine = typing.Tuple[conflicts.Literal, positions.SolverPosition]
+
+_LINE = model.LineState.LINE.value
+_EMPTY = model.LineState.EMPTY.value
+
+
+class Bitboard:
+    """A board stored as bitsets, so the simplest vertex rules can be applied
+    to every vertex at once.
+
+    Bit y * width + x of each layer stands for the vertex (x, y). For hlines
+    that is the line to the right of the vertex, and for vlines the line below
+    it. Shifting a layer by one or by the width then lines up each vertex with
+    the lines to its left or above it.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        # Vertices with a line to their right, and vertices with one below
+        self._hline_mask = 0
+        for y in range(height):
+            self._hline_mask |= ((1 << (width - 1)) - 1) << (y * width)
+        self._vline_mask = (1 << (width * (height - 1))) - 1
+        self.hline_lines = 0
+        self.hline_empties = 0
+        self.vline_lines = 0
+        self.vline_empties = 0
+        self.corners = 0
+        self.straights = 0
+
+    @classmethod
+    def from_state(cls, puzzle_state: model.PuzzleState) -> "Bitboard":
+        width = puzzle_state.width
+        board = cls(width, puzzle_state.height)
+        for v, code in enumerate(puzzle_state.tile_codes):
+            if code == model.TileType.CORNER.value:
+                board.corners |= 1 << v
+            elif code == model.TileType.STRAIGHT.value:
+                board.straights |= 1 << v
+        for i, code in enumerate(puzzle_state.hline_codes):
+            v = i + i // (width - 1)
+            if code == _LINE:
+                board.hline_lines |= 1 << v
+            elif code == _EMPTY:
+                board.hline_empties |= 1 << v
+        for v, code in enumerate(puzzle_state.vline_codes):
+            if code == _LINE:
+                board.vline_lines |= 1 << v
+            elif code == _EMPTY:
+                board.vline_empties |= 1 << v
+        return board
+
+    def sweep(self) -> typing.Optional[list[SweptLine]]:
+        """Applies FillEmptyEdgesVS, OnlyLineOptionVS and DeadEndVS to every
+        vertex until none of them sets another line.
+
+        Returns the lines set in the order they were set, or None once some
+        vertex can't be part of a loop. Lines set in the same round of the
+        sweep only depend on lines set in earlier rounds.
+        """
+        swept: list[SweptLine] = []
+        while True:
+            hline_any = self._hline_mask & ~(self.hline_lines | self.hline_empties)
+            vline_any = self._vline_mask & ~(self.vline_lines | self.vline_empties)
+            up, down, left, right = self._around(self.vline_lines, self.hline_lines)
+            one_line, two_lines, more_lines = _counts(up, down, left, right)
+            one_any, _, _ = _counts(*self._around(vline_any, hline_any))
+
+            vertical = up | down
+            horizontal = left | right
+            if (
+                more_lines
+                or self.straights & vertical & horizontal
+                or self.corners & ((up & down) | (left & right))
+            ):
+                return None
+
+            # FillEmptyEdgesVS and DeadEndVS empty the remaining lines, while
+            # OnlyLineOptionVS fills them. DeadEndVS never gets to run on a
+            # vertex OnlyLineOptionVS applies to
+            empty = two_lines | (one_any & ~one_line)
+            line = one_line & one_any
+            hline_empty = hline_any & (empty | (empty >> 1))
+            vline_empty = vline_any & (empty | (empty >> self.width))
+            hline_line = hline_any & (line | (line >> 1))
+            vline_line = vline_any & (line | (line >> self.width))
+            if hline_empty & hline_line or vline_empty & vline_line:
+                return None
+            if not (hline_empty | vline_empty | hline_line | vline_line):
+                return swept
+
+            self.hline_empties |= hline_empty
+            self.vline_empties |= vline_empty
+            self.hline_lines |= hline_line
+            self.vline_lines |= vline_line
+            sources = empty | line
+            self._collect(swept, True, hline_empty, model.LineState.EMPTY, sources)
+            self._collect(swept, False, vline_empty, model.LineState.EMPTY, sources)
+            self._collect(swept, True, hline_line, model.LineState.LINE, sources)
+            self._collect(swept, False, vline_line, model.LineState.LINE, sources)
+
+    def _around(self, vlines: int, hlines: int) -> typing.Tuple[int, int, int, int]:
+        # The given lines above, below, left and right of each vertex
+        return vlines << self.width, vlines, hlines << 1, hlines
+
+    def _collect(
+        self,
+        swept: list[SweptLine],
+        horizontal: bool,
+        bits: int,
+        state: model.LineState,
+        sources: int,
+    ) -> None:
+        while bits:
+            low = bits & -bits
+            bits ^= low
+            v = low.bit_length() - 1
+            y, x = divmod(v, self.width)
+            # The line was set by one of its two ends, preferring the first
+            source = (x, y)
+            if not sources >> v & 1:
+                source = (x + 1, y) if horizontal else (x, y + 1)
+            swept.append(((horizontal, x, y, state), source))
+
+
+def _counts(a: int, b: int, c: int, d: int) -> typing.Tuple[int, int, int]:
+    # The bits set in exactly one, exactly two and more than two of a, b, c, d
+    at_least_two = (a & b) | (a & c) | (a & d) | (b & c) | (b & d) | (c & d)
+    more_than_two = (a & b & (c | d)) | (c & d & (a | b))
+    return (a | b | c | d) & ~at_least_two, at_least_two & ~more_than_two, more_than_two
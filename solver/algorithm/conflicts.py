@@ -0,0 +1,131 @@
+import typing
+from solver import model
+
+
+# A line set to a particular state: (is horizontal, x, y, state)
+Literal = typing.Tuple[bool, int, int, model.LineState]
+
+
+def _neighbourhood() -> typing.Tuple[typing.Tuple[bool, int, int], ...]:
+    # Every edge touching a vertex within two steps of the centre. None of the
+    # vertex rules look further than this
+    edges: set[typing.Tuple[bool, int, int]] = set()
+    for dy in range(-2, 3):
+        for dx in range(-2 + abs(dy), 3 - abs(dy)):
+            edges.update(
+                (
+                    (False, dx, dy - 1),
+                    (True, dx, dy),
+                    (False, dx, dy),
+                    (True, dx - 1, dy),
+                )
+            )
+    return tuple(sorted(edges))
+
+
+_NEIGHBOURHOOD = _neighbourhood()
+
+
+class LineReasons:
+    """Records which guesses every decided line depends on.
+
+    The guesses are kept as a bitmask of decision levels. A line set by a rule
+    depends on everything the lines around the rule's vertex depend on, which
+    over-approximates the real reason but is always safe to backjump on.
+    """
+
+    def __init__(self, puzzle_state: model.PuzzleState):
+        self._state = puzzle_state
+        self._hlines: list[int] = []
+        self._vlines: list[int] = []
+
+    def load(self) -> None:
+        # Lines decided before the search started don't depend on any guess
+        self._hlines = [0] * ((self._state.width - 1) * self._state.height)
+        self._vlines = [0] * (self._state.width * (self._state.height - 1))
+
+    def record_levels(self, trail_start: int, levels: int) -> None:
+        """Makes the lines set since trail_start depend on the given levels."""
+        trail = self._state.trail
+        for i in range(trail_start, len(trail)):
+            horizontal, x, y, _ = trail[i]
+            self._set(horizontal, x, y, levels)
+
+    def record_around(self, trail_start: int, x: int, y: int) -> None:
+        """Makes the lines set since trail_start depend on the lines around
+        the vertex (x, y)."""
+        self.record_levels(trail_start, 0)
+        self.record_levels(trail_start, self.around(x, y))
+
+    def around(self, x: int, y: int) -> int:
+        levels = 0
+        for horizontal, dx, dy in _NEIGHBOURHOOD:
+            levels |= self.of(horizontal, x + dx, y + dy)
+        return levels
+
+    def of(self, horizontal: bool, x: int, y: int) -> int:
+        if horizontal:
+            line = self._state.get_hline(x, y)
+            if line is None or line == model.LineState.ANY:
+                return 0
+            return self._hlines[y * (self._state.width - 1) + x]
+
+        line = self._state.get_vline(x, y)
+        if line is None or line == model.LineState.ANY:
+            return 0
+        return self._vlines[y * self._state.width + x]
+
+    def _set(self, horizontal: bool, x: int, y: int, levels: int) -> None:
+        if horizontal:
+            self._hlines[y * (self._state.width - 1) + x] = levels
+        else:
+            self._vlines[y * self._state.width + x] = levels
+
+
+class NogoodStore:
+    """Remembers combinations of guesses that were shown to have no solution.
+
+    Nogoods stay valid for the whole search, so a guess that would complete
+    one can be skipped in favour of its alternative in any later subtree.
+    """
+
+    _MAX_SIZE = 8
+    _MAX_NOGOODS = 10000
+
+    def __init__(self, puzzle_state: model.PuzzleState, reasons: LineReasons):
+        self._state = puzzle_state
+        self._reasons = reasons
+        self._nogoods: dict[Literal, list[typing.Tuple[Literal, ...]]] = {}
+        self._count = 0
+
+    def clear(self) -> None:
+        self._nogoods = {}
+        self._count = 0
+
+    def add(self, nogood: typing.Tuple[Literal, ...]) -> None:
+        if len(nogood) > self._MAX_SIZE or self._count >= self._MAX_NOGOODS:
+            return
+        for literal in nogood:
+            self._nogoods.setdefault(literal, []).append(nogood)
+        self._count += 1
+
+    def refutes(self, literal: Literal) -> typing.Optional[int]:
+        """Returns the levels that rule out the literal, if a nogood does."""
+        for nogood in self._nogoods.get(literal, []):
+            levels = 0
+            for other in nogood:
+                if other == literal:
+                    continue
+                horizontal, x, y, state = other
+                line = (
+                    self._state.get_hline(x, y)
+                    if horizontal
+                    else self._state.get_vline(x, y)
+                )
+                if line != state:
+                    break
+                levels |= self._reasons.of(horizontal, x, y)
+            else:
+                return levels
+
+        return None
@@ -0,0 +1,170 @@
+import typing
+from solver import model
+
+
+# (is horizontal, x, y)
+Edge = typing.Tuple[bool, int, int]
+
+
+class LoopConnectivity:
+    """Looks at the graph of vertices joined by edges that aren't EMPTY.
+
+    The loop has to pass through every pearl and every LINE edge, so they all
+    have to lie in one component of this graph. A closed loop also crosses
+    every cut in the graph an even number of times, so it can never use a
+    bridge.
+    """
+
+    def __init__(self, puzzle_state: model.PuzzleState):
+        self._state = puzzle_state
+
+    def is_connected(self) -> bool:
+        """Whether every pearl and LINE edge can still be reached from the
+        others."""
+        width = self._state.width
+        height = self._state.height
+        parent = list(range(width * height))
+        required = bytearray(width * height)
+        for y in range(height):
+            for x in range(width):
+                if self._state.get_tile(x, y) != model.TileType.ANY:
+                    required[y * width + x] = 1
+
+        for y in range(height):
+            for x in range(width - 1):
+                line = self._state.get_hline(x, y)
+                if line != model.LineState.EMPTY:
+                    self._join(parent, y * width + x, y * width + x + 1)
+                if line == model.LineState.LINE:
+                    required[y * width + x] = 1
+        for y in range(height - 1):
+            for x in range(width):
+                line = self._state.get_vline(x, y)
+                if line != model.LineState.EMPTY:
+                    self._join(parent, y * width + x, (y + 1) * width + x)
+                if line == model.LineState.LINE:
+                    required[y * width + x] = 1
+
+        root: typing.Optional[int] = None
+        for v, r in enumerate(required):
+            if not r:
+                continue
+            if root is None:
+                root = self._find(parent, v)
+            elif self._find(parent, v) != root:
+                return False
+        return True
+
+    def unusable_edges(self) -> typing.Optional[list[Edge]]:
+        """Returns the edges that aren't EMPTY but can't be part of the loop.
+
+        These are the bridges of the graph, along with the edges of any
+        component without a pearl or LINE edge. Returns None if the pearls
+        and LINE edges are split between components.
+        """
+        width = self._state.width
+        height = self._state.height
+        hline_count = (width - 1) * height
+        vertex_count = width * height
+        # (neighbour, edge id) pairs, where vertical edges follow the
+        # horizontal ones
+        adjacent: list[list[typing.Tuple[int, int]]] = [[] for _ in range(vertex_count)]
+        required = bytearray(vertex_count)
+        for y in range(height):
+            for x in range(width):
+                if self._state.get_tile(x, y) != model.TileType.ANY:
+                    required[y * width + x] = 1
+        for y in range(height):
+            for x in range(width - 1):
+                line = self._state.get_hline(x, y)
+                if line == model.LineState.EMPTY:
+                    continue
+                a = y * width + x
+                edge = y * (width - 1) + x
+                adjacent[a].append((a + 1, edge))
+                adjacent[a + 1].append((a, edge))
+                if line == model.LineState.LINE:
+                    required[a] = 1
+        for y in range(height - 1):
+            for x in range(width):
+                line = self._state.get_vline(x, y)
+                if line == model.LineState.EMPTY:
+                    continue
+                a = y * width + x
+                edge = hline_count + a
+                adjacent[a].append((a + width, edge))
+                adjacent[a + width].append((a, edge))
+                if line == model.LineState.LINE:
+                    required[a] = 1
+
+        unusable: list[int] = []
+        unreached: list[int] = []
+        required_component = False
+        order = [-1] * vertex_count
+        low = [0] * vertex_count
+        counter = 0
+        for start in range(vertex_count):
+            if order[start] >= 0 or len(adjacent[start]) == 0:
+                if required[start] and order[start] < 0:
+                    # A pearl with no edges left to reach it
+                    return None
+                continue
+
+            # Iterative depth first search, keeping the edge used to reach
+            # each vertex and how far through its neighbours it has got
+            component_edges: set[int] = set()
+            has_required = False
+            order[start] = low[start] = counter
+            counter += 1
+            stack = [(start, -1, 0)]
+            while len(stack) > 0:
+                v, via, i = stack[-1]
+                if i < len(adjacent[v]):
+                    stack[-1] = (v, via, i + 1)
+                    w, edge = adjacent[v][i]
+                    if edge == via:
+                        continue
+                    component_edges.add(edge)
+                    if order[w] < 0:
+                        order[w] = low[w] = counter
+                        counter += 1
+                        stack.append((w, edge, 0))
+                    else:
+                        low[v] = min(low[v], order[w])
+                    continue
+
+                stack.pop()
+                has_required = has_required or bool(required[v])
+                if len(stack) > 0:
+                    parent = stack[-1][0]
+                    low[parent] = min(low[parent], low[v])
+                    if low[v] > order[parent]:
+                        unusable.append(via)
+
+            if has_required:
+                if required_component:
+                    return None
+                required_component = True
+            else:
+                unreached.extend(component_edges)
+
+        if required_component:
+            # Without any pearls or lines the loop could be anywhere
+            unusable.extend(unreached)
+        return [self._edge(e, width, hline_count) for e in set(unusable)]
+
+    def _edge(self, edge: int, width: int, hline_count: int) -> Edge:
+        if edge < hline_count:
+            y, x = divmod(edge, width - 1)
+            return True, x, y
+        y, x = divmod(edge - hline_count, width)
+        return False, x, y
+
+    def _find(self, parent: list[int], v: int) -> int:
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    def _join(self, parent: list[int], a: int, b: int) -> None:
+        parent[self._find(parent, a)] = self._find(parent, b)
@@ -0,0 +1,214 @@
+from dataclasses import dataclass
+import typing
+from solver import model
+
+
+# A line deduced from the colouring: (is horizontal, x, y, state)
+FaceDeduction = typing.Tuple[bool, int, int, model.LineState]
+
+_Edge = typing.Tuple[bool, int, int]
+
+
+@dataclass
+class _FaceChange:
+    trail_index: int
+    # The root joined to another component, or -1 for a contradiction
+    child: int
+    parent: int
+    rank: int
+    members: int
+
+
+class FaceColouring:
+    """Colours the faces between the vertices as inside or outside the loop.
+
+    Two faces sharing an edge have the same colour exactly when that edge is
+    EMPTY, so every decided line relates the colours of its two faces. Faces
+    are kept in components with a known parity relative to the component's
+    root, and the faces beyond the border of the board are a single face that
+    is always outside. Once both faces of an undecided edge fall in the same
+    component, that edge is decided however far apart the lines relating them
+    are.
+
+    Components are never path compressed, so the tracker can be rolled back
+    alongside the puzzle trail.
+    """
+
+    def __init__(self, puzzle_state: model.PuzzleState):
+        self._state = puzzle_state
+        self._columns = 0
+        self._rows = 0
+        self._outside = 0
+        self._parent: list[int] = []
+        self._parity: bytearray = bytearray()
+        self._rank: bytearray = bytearray()
+        self._members: list[list[int]] = []
+        self._contradictions = 0
+        self._processed = 0
+        self._history: list[_FaceChange] = []
+        self._deductions: list[FaceDeduction] = []
+
+    @property
+    def is_valid(self) -> bool:
+        return self._contradictions == 0
+
+    def load(self) -> None:
+        """Rebuilds the colouring from the lines currently on the board."""
+        self._columns = max(self._state.width - 1, 0)
+        self._rows = max(self._state.height - 1, 0)
+        self._outside = self._columns * self._rows
+        face_count = self._outside + 1
+        self._parent = list(range(face_count))
+        self._parity = bytearray(face_count)
+        self._rank = bytearray(face_count)
+        self._members = [[f] for f in range(face_count)]
+        self._contradictions = 0
+        self._history = []
+        self._deductions = []
+        for y in range(self._state.height):
+            for x in range(self._state.width - 1):
+                self._add_edge(True, x, y, -1)
+        for y in range(self._state.height - 1):
+            for x in range(self._state.width):
+                self._add_edge(False, x, y, -1)
+        # Lines placed before loading aren't part of the trail, so they can
+        # never be undone
+        self._history = []
+        self._processed = self._state.trail_length
+
+    def update(self) -> list[FaceDeduction]:
+        """Adds any lines placed on the trail since the last update.
+
+        Returns the undecided edges whose state now follows from the colouring,
+        including any found while loading. These have to be placed before the
+        trail is next rolled back.
+        """
+        trail = self._state.trail
+        for i in range(self._processed, len(trail)):
+            horizontal, x, y, _ = trail[i]
+            self._add_edge(horizontal, x, y, i)
+        self._processed = len(trail)
+        deductions = self._deductions
+        self._deductions = []
+        return deductions
+
+    def undo(self, trail_length: int) -> None:
+        """Removes the lines recorded at or after the given trail length."""
+        while len(self._history) > 0 and self._history[-1].trail_index >= trail_length:
+            change = self._history.pop()
+            if change.child < 0:
+                self._contradictions -= 1
+                continue
+            self._parent[change.child] = change.child
+            self._parity[change.child] = 0
+            self._rank[change.parent] = change.rank
+            del self._members[change.parent][change.members :]
+        self._deductions = []
+        self._processed = min(self._processed, trail_length)
+
+    def _face(self, x: int, y: int) -> int:
+        if 0 <= x < self._columns and 0 <= y < self._rows:
+            return y * self._columns + x
+        return self._outside
+
+    def _faces(self, horizontal: bool, x: int, y: int) -> typing.Tuple[int, int]:
+        if horizontal:
+            return self._face(x, y - 1), self._face(x, y)
+        return self._face(x - 1, y), self._face(x, y)
+
+    def _face_edges(self, face: int) -> list[_Edge]:
+        if face == self._outside:
+            edges: list[_Edge] = []
+            for x in range(self._state.width - 1):
+                edges.append((True, x, 0))
+                edges.append((True, x, self._state.height - 1))
+            for y in range(self._state.height - 1):
+                edges.append((False, 0, y))
+                edges.append((False, self._state.width - 1, y))
+            return edges
+
+        y, x = divmod(face, self._columns)
+        return [(True, x, y), (True, x, y + 1), (False, x, y), (False, x + 1, y)]
+
+    def _find(self, face: int) -> typing.Tuple[int, int]:
+        parity = 0
+        while self._parent[face] != face:
+            parity ^= self._parity[face]
+            face = self._parent[face]
+        return face, parity
+
+    def _line(
+        self, horizontal: bool, x: int, y: int
+    ) -> typing.Optional[model.LineState]:
+        return (
+            self._state.get_hline(x, y) if horizontal else self._state.get_vline(x, y)
+        )
+
+    def _add_edge(self, horizontal: bool, x: int, y: int, trail_index: int) -> None:
+        line = self._line(horizontal, x, y)
+        if line is None or line == model.LineState.ANY:
+            return
+
+        a, b = self._faces(horizontal, x, y)
+        root_a, parity_a = self._find(a)
+        root_b, parity_b = self._find(b)
+        differ = 1 if line == model.LineState.LINE else 0
+        if root_a == root_b:
+            if parity_a ^ parity_b != differ:
+                self._contradictions += 1
+                self._history.append(
+                    _FaceChange(
+                        trail_index=trail_index, child=-1, parent=-1, rank=0, members=0
+                    )
+                )
+            return
+
+        # Look for newly decided edges from the smaller component before
+        # joining it to the larger one
+        if len(self._members[root_a]) > len(self._members[root_b]):
+            root_a, root_b = root_b, root_a
+            parity_a, parity_b = parity_b, parity_a
+        self._deduce(root_a, root_b, parity_a ^ parity_b ^ differ)
+
+        child, parent = root_a, root_b
+        if self._rank[child] > self._rank[parent]:
+            child, parent = parent, child
+        self._history.append(
+            _FaceChange(
+                trail_index=trail_index,
+                child=child,
+                parent=parent,
+                rank=self._rank[parent],
+                members=len(self._members[parent]),
+            )
+        )
+        self._parent[child] = parent
+        self._parity[child] = parity_a ^ parity_b ^ differ
+        if self._rank[child] == self._rank[parent]:
+            self._rank[parent] += 1
+        self._members[parent].extend(self._members[child])
+
+    def _deduce(self, small: int, large: int, offset: int) -> None:
+        # offset is the parity of the small root relative to the large root
+        for face in self._members[small]:
+            _, parity = self._find(face)
+            for horizontal, x, y in self._face_edges(face):
+                if self._line(horizontal, x, y) != model.LineState.ANY:
+                    continue
+                a, b = self._faces(horizontal, x, y)
+                other = b if a == face else a
+                root, other_parity = self._find(other)
+                if root != large:
+                    continue
+                self._deductions.append(
+                    (
+                        horizontal,
+                        x,
+                        y,
+                        (
+                            model.LineState.LINE
+                            if parity ^ offset ^ other_parity
+                            else model.LineState.EMPTY
+                        ),
+                    )
+                )
@@ -0,0 +1,190 @@
+import heapq
+import random
+import typing
+from solver import model
+from . import heuristics, positions
+
+
+# Candidates are keyed by the vertex they are first seen from, in the same
+# order a full scan of the board would visit them: up, right, down, left
+_RIGHT = 1
+_DOWN = 2
+
+_Edge = typing.Tuple[bool, int, int]
+
+
+class GuessQueue:
+    """Keeps the edges that may still be guessed ordered by the priority the
+    heuristic gives them.
+
+    Rather than rescanning the board for every guess, edges near a changed
+    line are pushed again with their new priority. Outdated entries are left in
+    the heap and pushed again or discarded once they reach the top.
+
+    Edges with the same priority are taken in board order, or in a shuffled
+    order when a seed is given.
+    """
+
+    def __init__(
+        self,
+        puzzle_state: model.PuzzleState,
+        heuristic: heuristics.GuessHeuristic,
+        seed: typing.Optional[int] = None,
+    ):
+        self._state = puzzle_state
+        self._heuristic = heuristic
+        self._seed = seed
+        self._ranks: list[int] = []
+        self._heap: list[typing.Tuple[int, int, int]] = []
+        self._dirty: set[_Edge] = set()
+        self._touched: set[positions.SolverPosition] = set()
+        self._processed = 0
+        self._built = False
+
+    def load(self) -> None:
+        self._ranks = list(range(self._state.width * self._state.height * 4))
+        if self._seed is not None:
+            random.Random(self._seed).shuffle(self._ranks)
+        # The heap is built from the board the first time it's needed, so a
+        # solver that only propagates never pays for it
+        self._heap = []
+        self._built = False
+
+    def _build(self) -> None:
+        self._heap = []
+        for y in range(self._state.height):
+            for x in range(self._state.width):
+                if self._state.get_hline(x, y) == model.LineState.ANY:
+                    self._heap.append(self._entry(True, x, y))
+                if self._state.get_vline(x, y) == model.LineState.ANY:
+                    self._heap.append(self._entry(False, x, y))
+        heapq.heapify(self._heap)
+        self._dirty = set()
+        self._touched = set()
+        self._processed = self._state.trail_length
+        self._built = True
+
+    def undo(self, trail_length: int) -> None:
+        """Marks the lines about to be undone as changed.
+
+        This has to be called before the puzzle state itself is rolled back,
+        while the lines being undone are still on the trail.
+        """
+        trail = self._state.trail
+        for i in range(trail_length, len(trail)):
+            horizontal, x, y, _ = trail[i]
+            self._dirty.add((horizontal, x, y))
+        self._processed = min(self._processed, trail_length)
+
+    def touch(self, vertices: typing.Iterable[positions.SolverPosition]) -> None:
+        """Marks vertices whose priority may have changed without a line
+        next to them changing."""
+        self._touched.update(vertices)
+
+    def best(self) -> typing.Optional[positions.GuessCandidate]:
+        self._sync()
+        return self._top()
+
+    def candidates(self, limit: int) -> list[positions.GuessCandidate]:
+        """Returns up to limit edges in the order they would be guessed."""
+        self._sync()
+        taken: list[typing.Tuple[int, int, int]] = []
+        candidates: list[positions.GuessCandidate] = []
+        while len(candidates) < limit:
+            candidate = self._top()
+            if candidate is None:
+                break
+            candidates.append(candidate)
+            taken.append(heapq.heappop(self._heap))
+        for entry in taken:
+            heapq.heappush(self._heap, entry)
+        return candidates
+
+    def _top(self) -> typing.Optional[positions.GuessCandidate]:
+        while len(self._heap) > 0:
+            priority, _, key = self._heap[0]
+            horizontal, x, y = self._edge(key)
+            if self._line(horizontal, x, y) != model.LineState.ANY:
+                heapq.heappop(self._heap)
+                continue
+
+            entry = self._entry(horizontal, x, y)
+            if entry[0] != priority:
+                heapq.heapreplace(self._heap, entry)
+                continue
+
+            return positions.GuessCandidate(
+                direction=(
+                    positions.LineDirection.HORIZONTAL
+                    if horizontal
+                    else positions.LineDirection.VERTICAL
+                ),
+                x=x,
+                y=y,
+                state=self._heuristic.first_state,
+            )
+
+        return None
+
+    def _sync(self) -> None:
+        if not self._built:
+            self._build()
+            return
+
+        trail = self._state.trail
+        for i in range(self._processed, len(trail)):
+            horizontal, x, y, _ = trail[i]
+            self._dirty.add((horizontal, x, y))
+        self._processed = len(trail)
+
+        # A changed line alters the line count of both its vertices, which in
+        # turn changes the priority of every edge touching either of them
+        for horizontal, x, y in self._dirty:
+            self._touched.update(self._endpoints(horizontal, x, y))
+        self._dirty = set()
+
+        pending: set[_Edge] = set()
+        for v_x, v_y in self._touched:
+            pending.update(
+                (
+                    (False, v_x, v_y - 1),
+                    (True, v_x, v_y),
+                    (False, v_x, v_y),
+                    (True, v_x - 1, v_y),
+                )
+            )
+        self._touched = set()
+
+        for horizontal, x, y in pending:
+            if self._line(horizontal, x, y) == model.LineState.ANY:
+                heapq.heappush(self._heap, self._entry(horizontal, x, y))
+
+    def _entry(self, horizontal: bool, x: int, y: int) -> typing.Tuple[int, int, int]:
+        key = (y * self._state.width + x) * 4 + (_RIGHT if horizontal else _DOWN)
+        return -self._edge_priority(horizontal, x, y), self._ranks[key], key
+
+    def _edge(self, key: int) -> _Edge:
+        vertex, direction = divmod(key, 4)
+        y, x = divmod(vertex, self._state.width)
+        return direction == _RIGHT, x, y
+
+    def _line(
+        self, horizontal: bool, x: int, y: int
+    ) -> typing.Optional[model.LineState]:
+        return (
+            self._state.get_hline(x, y) if horizontal else self._state.get_vline(x, y)
+        )
+
+    def _endpoints(
+        self, horizontal: bool, x: int, y: int
+    ) -> typing.Tuple[positions.SolverPosition, positions.SolverPosition]:
+        return ((x, y), (x + 1, y)) if horizontal else ((x, y), (x, y + 1))
+
+    def _edge_priority(self, horizontal: bool, x: int, y: int) -> int:
+        a, b = self._endpoints(horizontal, x, y)
+        return max(self._vertex_priority(*a), self._vertex_priority(*b))
+
+    def _vertex_priority(self, x: int, y: int) -> int:
+        return self._heuristic.vertex_priority(
+            positions.Vertex(puzzle_state=self._state, x=x, y=y)
+        )
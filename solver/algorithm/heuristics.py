@@ -0,0 +1,82 @@
+import abc
+from solver import model
+from . import positions, segments
+
+
+class GuessHeuristic(abc.ABC):
+    """Decides which edge the solver guesses next.
+
+    Every vertex gets a priority, and an edge is guessed in the order of the
+    highest priority of its two vertices. Priorities should only depend on the
+    vertex and its own edges, or on segment ends, since those are the vertices
+    re-evaluated as lines change.
+    """
+
+    first_state: model.LineState = model.LineState.LINE
+
+    def __init__(
+        self, puzzle_state: model.PuzzleState, line_segments: segments.LineSegments
+    ):
+        self.puzzle_state = puzzle_state
+        self.line_segments = line_segments
+
+    @abc.abstractmethod
+    def vertex_priority(self, vertex: positions.Vertex) -> int:
+        pass
+
+
+class TilePriorityGH(GuessHeuristic):
+
+    def vertex_priority(self, vertex: positions.Vertex) -> int:
+        if vertex.type == model.TileType.CORNER and vertex.count_lines > 0:
+            return positions.GuessPriority.PARTIAL_CORNER
+        elif vertex.type != model.TileType.ANY:
+            return positions.GuessPriority.UNKNOWN_RESTRICTIVE_TILE
+        elif vertex.count_lines > 0:
+            return positions.GuessPriority.PARTIAL_ANY_TILE
+        else:
+            return positions.GuessPriority.REMAINING
+
+
+class EmptyFirstTilePriorityGH(TilePriorityGH):
+    """Guesses the same edges as TilePriorityGH, but tries leaving each one
+    empty before placing a line on it."""
+
+    first_state = model.LineState.EMPTY
+
+
+class MostConstrainedGH(GuessHeuristic):
+
+    def vertex_priority(self, vertex: positions.Vertex) -> int:
+        count_any = vertex.count_any
+        if count_any == 0:
+            return 0
+
+        # A vertex with one line has to continue through one of its remaining
+        # edges, so it's more constrained than any vertex without a line
+        priority = 5 - count_any
+        if vertex.count_lines == 1:
+            priority += 4
+        if vertex.type != model.TileType.ANY:
+            priority += 1
+        return priority
+
+
+class SegmentEndGH(GuessHeuristic):
+
+    def vertex_priority(self, vertex: positions.Vertex) -> int:
+        length = self.line_segments.segment_length(vertex.x, vertex.y)
+        if length > 0:
+            return length + 1
+        return 1 if vertex.type != model.TileType.ANY else 0
+
+
+class PearlFirstGH(GuessHeuristic):
+
+    def vertex_priority(self, vertex: positions.Vertex) -> int:
+        if vertex.type != model.TileType.ANY:
+            return 4 if vertex.count_lines > 0 else 3
+        for adjacent in vertex.adjacent_vertices:
+            if adjacent.type != model.TileType.ANY:
+                return 2
+        return 1 if vertex.count_lines > 0 else 0
@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import typing
+from solver import model
+from . import heuristics, positions, solver, validator
+
+
+_Subproblem = typing.Tuple[model.PuzzleSnapshot, typing.Type[heuristics.GuessHeuristic]]
+
+
+def solve_parallel(
+    puzzle_state: model.PuzzleState,
+    processes: typing.Optional[int] = None,
+    split_depth: typing.Optional[int] = None,
+    heuristic: typing.Type[heuristics.GuessHeuristic] = heuristics.TilePriorityGH,
+) -> validator.SolutionValue:
+    """Solves the puzzle by splitting the top of the guess tree into
+    independent subproblems and searching them across a process pool.
+
+    The first solution found is applied to the puzzle state and the remaining
+    workers are terminated. Returns INVALID if no subproblem has a solution.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if split_depth is None:
+        # Aim for a few subproblems per process so a quick dead end doesn't
+        # leave a worker idle
+        split_depth = (processes * 4).bit_length()
+
+    solution, subproblems = _split(puzzle_state.snapshot(), split_depth, heuristic)
+    if solution is None and len(subproblems) > 0:
+        with multiprocessing.Pool(processes=processes) as pool:
+            # Leaving the with block terminates any workers still searching
+            for result in pool.imap_unordered(
+                _solve_subproblem, [(s, heuristic) for s in subproblems]
+            ):
+                if result is not None:
+                    solution = result
+                    break
+
+    if solution is None:
+        return validator.SolutionValue.INVALID
+
+    puzzle_state.restore(solution)
+    return validator.SolutionValue.SOLVED
+
+
+def _split(
+    snapshot: model.PuzzleSnapshot,
+    depth: int,
+    heuristic: typing.Type[heuristics.GuessHeuristic],
+) -> typing.Tuple[typing.Optional[model.PuzzleSnapshot], list[model.PuzzleSnapshot]]:
+    frontier = [snapshot]
+    for _ in range(depth):
+        next_frontier: list[model.PuzzleSnapshot] = []
+        for subproblem in frontier:
+            state = model.PuzzleState(1, 1)
+            state.restore(subproblem)
+            solution_state, guess = solver.Solver(
+                puzzle_state=state, heuristic=heuristic
+            ).propagate()
+            if solution_state == validator.SolutionValue.SOLVED:
+                return state.snapshot(), []
+            if guess is None:
+                continue
+
+            propagated = state.snapshot()
+            for line_state in (model.LineState.LINE, model.LineState.EMPTY):
+                state.restore(propagated)
+                _place(state, guess, line_state)
+                next_frontier.append(state.snapshot())
+        frontier = next_frontier
+
+    return None, frontier
+
+
+def _place(
+    puzzle_state: model.PuzzleState,
+    guess: positions.GuessCandidate,
+    line_state: model.LineState,
+) -> None:
+    if guess.direction == positions.LineDirection.HORIZONTAL:
+        puzzle_state.set_hline(guess.x, guess.y, line_state)
+    else:
+        puzzle_state.set_vline(guess.x, guess.y, line_state)
+
+
+def _solve_subproblem(subproblem: _Subproblem) -> typing.Optional[model.PuzzleSnapshot]:
+    snapshot, heuristic = subproblem
+    state = model.PuzzleState(1, 1)
+    state.restore(snapshot)
+    if (
+        solver.Solver(puzzle_state=state, heuristic=heuristic).solve()
+        != validator.SolutionValue.SOLVED
+    ):
+        return None
+    return state.snapshot()
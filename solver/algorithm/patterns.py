@@ -0,0 +1,236 @@
+import typing
+from solver import model
+from . import positions, stats, vertex
+
+
+# Vertices the local rules look at, relative to the one being served: the
+# vertex itself, its neighbours and the vertices two steps away in a line
+_VERTICES: typing.Tuple[typing.Tuple[int, int], ...] = (
+    (0, 0),
+    (0, -1),
+    (1, 0),
+    (0, 1),
+    (-1, 0),
+    (0, -2),
+    (2, 0),
+    (0, 2),
+    (-2, 0),
+)
+
+
+def _edges() -> typing.Tuple[typing.Tuple[bool, int, int], ...]:
+    edges: set[typing.Tuple[bool, int, int]] = set()
+    for dx, dy in _VERTICES:
+        edges.update(
+            (
+                (False, dx, dy - 1),
+                (True, dx, dy),
+                (False, dx, dy),
+                (True, dx - 1, dy),
+            )
+        )
+    return tuple(sorted(edges))
+
+
+# Every edge touching one of those vertices
+_EDGES = _edges()
+
+# Positions of a vertex's neighbourhood in each layer of the board, along with
+# how the board is clipped around it
+_Layout = typing.Tuple[
+    int, typing.Tuple[int, ...], typing.Tuple[int, ...], typing.Tuple[int, ...]
+]
+
+# Lines the rules decide for a neighbourhood, along with the index of the rule
+# that decided each: (is horizontal, dx, dy, state, rule)
+_Deduction = typing.Tuple[bool, int, int, model.LineState, int]
+
+# The most neighbourhoods a table holds. A full table is emptied, so a
+# long-running process doesn't keep every neighbourhood it has ever seen
+_MAX_ENTRIES = 1 << 14
+
+# Tables are shared by every solver using the same rules, so each
+# neighbourhood is worked out once per process until its table fills up
+_TABLES: dict[
+    typing.Tuple[typing.Type[vertex.VertexSolver], ...],
+    dict[bytes, typing.Tuple[_Deduction, ...]],
+] = {}
+
+
+class LocalPatternVS(vertex.VertexSolver):
+    """Applies a set of local rules through a lookup table.
+
+    The neighbourhood of a vertex, meaning the tiles and lines the local rules
+    can see, is packed into a key. The first time a key is seen the rules are
+    run to a fixpoint on a copy of just that neighbourhood, and the lines they
+    decide are stored against it. Every later vertex with the same
+    neighbourhood is solved with one lookup. Working a neighbourhood out
+    costs far more than running the rules on the board directly, so this only
+    pays off when the same neighbourhoods come up again and again.
+    """
+
+    def __init__(
+        self,
+        puzzle_state: model.PuzzleState,
+        rules: typing.Sequence[typing.Type[vertex.VertexSolver]],
+        affected: typing.Optional[positions.AffectedPositions] = None,
+    ):
+        super().__init__(puzzle_state=puzzle_state, affected=affected)
+        assert all(r.local for r in rules)
+        self.rules = tuple(rules)
+        self.tile_types = frozenset(t for r in rules for t in r.tile_types)
+        self._table = _TABLES.setdefault(self.rules, {})
+        self._layouts: list[_Layout] = []
+        self._layout_size = (0, 0)
+        # Set to count what each of the rules behind the table does
+        self.stats: typing.Optional[stats.SolverStats] = None
+
+    def make_updates(self, vertex: positions.Vertex) -> set[positions.SolverPosition]:
+        key = self._key(vertex.x, vertex.y)
+        deductions = self._table.get(key)
+        if deductions is None:
+            deductions = self._compile(self._neighbourhood(vertex.x, vertex.y))
+            if len(self._table) >= _MAX_ENTRIES:
+                self._table.clear()
+            self._table[key] = deductions
+
+        if self.stats is not None:
+            self._record(deductions)
+
+        updates: set[positions.SolverPosition] = set()
+        for horizontal, dx, dy, state, _ in deductions:
+            x = vertex.x + dx
+            y = vertex.y + dy
+            if horizontal:
+                self.puzzle_state.set_hline(x, y, state)
+                updates.update(self.affected.hline_tiles(x, y))
+            else:
+                self.puzzle_state.set_vline(x, y, state)
+                updates.update(self.affected.vline_tiles(x, y))
+
+        return updates
+
+    def _record(self, deductions: typing.Tuple[_Deduction, ...]) -> None:
+        # The rules weren't run, so they're only credited with what they
+        # decided
+        assert self.stats is not None
+        for i in {d[4] for d in deductions}:
+            self.stats.rule(self.rules[i].__name__).hits += 1
+        for deduction in deductions:
+            self.stats.rule(self.rules[deduction[4]].__name__).edges_set += 1
+
+    def _key(self, x: int, y: int) -> bytes:
+        # Reads the neighbourhood straight from the layers, leaving out
+        # whatever is off the board. The clipping tells those cases apart
+        state = self.puzzle_state
+        if self._layout_size != (state.width, state.height):
+            self._load_layouts()
+        clip, tiles, hlines, vlines = self._layouts[y * state.width + x]
+        return (
+            bytes((clip,))
+            + bytes(map(state.tile_codes.__getitem__, tiles))
+            + bytes(map(state.hline_codes.__getitem__, hlines))
+            + bytes(map(state.vline_codes.__getitem__, vlines))
+        )
+
+    def _load_layouts(self) -> None:
+        width = self.puzzle_state.width
+        height = self.puzzle_state.height
+        self._layout_size = (width, height)
+        self._layouts = []
+        for y in range(height):
+            for x in range(width):
+                clip = (
+                    min(x, 3) * 64
+                    + min(width - 1 - x, 3) * 16
+                    + min(y, 3) * 4
+                    + min(height - 1 - y, 3)
+                )
+                tiles = tuple(
+                    (y + dy) * width + x + dx
+                    for dx, dy in _VERTICES
+                    if 0 <= x + dx < width and 0 <= y + dy < height
+                )
+                hlines = tuple(
+                    (y + dy) * (width - 1) + x + dx
+                    for horizontal, dx, dy in _EDGES
+                    if horizontal and 0 <= x + dx < width - 1 and 0 <= y + dy < height
+                )
+                vlines = tuple(
+                    (y + dy) * width + x + dx
+                    for horizontal, dx, dy in _EDGES
+                    if not horizontal
+                    and 0 <= x + dx < width
+                    and 0 <= y + dy < height - 1
+                )
+                self._layouts.append((clip, tiles, hlines, vlines))
+
+    def _neighbourhood(self, x: int, y: int) -> bytes:
+        # Anything off the board is stored as 0
+        state = self.puzzle_state
+        codes = bytearray()
+        for dx, dy in _VERTICES:
+            tile = state.get_tile(x + dx, y + dy)
+            codes.append(0 if tile is None else tile.value)
+        for horizontal, dx, dy in _EDGES:
+            line = (
+                state.get_hline(x + dx, y + dy)
+                if horizontal
+                else state.get_vline(x + dx, y + dy)
+            )
+            codes.append(0 if line is None else line.value)
+        return bytes(codes)
+
+    def _compile(self, neighbourhood: bytes) -> typing.Tuple[_Deduction, ...]:
+        tiles = dict(zip(_VERTICES, neighbourhood))
+        edges = dict(zip(_EDGES, neighbourhood[len(_VERTICES) :]))
+
+        # Rebuild the neighbourhood on a board clipped the same way the real
+        # one is, so the rules see the same edges of the board
+        left = self._reach(edges[(True, -3, 0)], tiles[(-2, 0)], tiles[(-1, 0)])
+        right = self._reach(edges[(True, 2, 0)], tiles[(2, 0)], tiles[(1, 0)])
+        up = self._reach(edges[(False, 0, -3)], tiles[(0, -2)], tiles[(0, -1)])
+        down = self._reach(edges[(False, 0, 2)], tiles[(0, 2)], tiles[(0, 1)])
+        scratch = model.PuzzleState(left + right + 1, up + down + 1)
+        for (dx, dy), code in tiles.items():
+            tile = model.TileType(code) if code else None
+            if tile is not None:
+                scratch.set_tile(left + dx, up + dy, tile)
+        for (horizontal, dx, dy), code in edges.items():
+            if not code:
+                continue
+            if horizontal:
+                scratch.set_hline(left + dx, up + dy, model.LineState(code))
+            else:
+                scratch.set_vline(left + dx, up + dy, model.LineState(code))
+
+        # Serve the vertex the way the solver does, until no rule applies
+        centre = positions.Vertex(puzzle_state=scratch, x=left, y=up)
+        rules = [
+            (i, r(puzzle_state=scratch))
+            for i, r in enumerate(self.rules)
+            if centre.type in r.tile_types
+        ]
+        scratch.begin_trail()
+        sources: list[int] = []
+        fired = True
+        while fired:
+            fired = False
+            for i, rule in rules:
+                trail_start = scratch.trail_length
+                if len(rule.make_updates(centre)) > 0:
+                    sources.extend([i] * (scratch.trail_length - trail_start))
+                    fired = True
+                    break
+
+        deductions: list[_Deduction] = []
+        for (horizontal, x, y, _), source in zip(scratch.trail, sources):
+            line = scratch.get_hline(x, y) if horizontal else scratch.get_vline(x, y)
+            assert line is not None
+            deductions.append((horizontal, x - left, y - up, line, source))
+        return tuple(deductions)
+
+    def _reach(self, edge: int, far: int, near: int) -> int:
+        # How far the board goes in one direction, given what is on the board
+        # three, two and one steps away
+        return 3 if edge else 2 if far else 1 if near else 0
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+import multiprocessing
+import typing
+from solver import model
+from . import heuristics, solver, validator, vertex
+
+
+@dataclass(frozen=True)
+class SolverConfig:
+    heuristic: typing.Type[heuristics.GuessHeuristic] = heuristics.TilePriorityGH
+    rule_order: typing.Optional[typing.Tuple[typing.Type[vertex.VertexSolver], ...]] = (
+        None
+    )
+    seed: typing.Optional[int] = None
+    probe_budget: int = 0
+    sweep: bool = False
+    pattern_table: bool = False
+
+
+DEFAULT_PORTFOLIO: typing.Tuple[SolverConfig, ...] = (
+    SolverConfig(),
+    SolverConfig(heuristic=heuristics.SegmentEndGH),
+    SolverConfig(heuristic=heuristics.PearlFirstGH),
+    SolverConfig(heuristic=heuristics.MostConstrainedGH),
+    SolverConfig(seed=1),
+    SolverConfig(heuristic=heuristics.SegmentEndGH, seed=2),
+    SolverConfig(heuristic=heuristics.EmptyFirstTilePriorityGH),
+    SolverConfig(heuristic=heuristics.PearlFirstGH, seed=3),
+)
+
+
+_Result = typing.Tuple[validator.SolutionValue, typing.Optional[model.PuzzleSnapshot]]
+
+
+def solve_portfolio(
+    puzzle_state: model.PuzzleState,
+    configs: typing.Sequence[SolverConfig] = DEFAULT_PORTFOLIO,
+    processes: typing.Optional[int] = None,
+) -> validator.SolutionValue:
+    """Races differently configured solvers in separate processes.
+
+    The first solution found is applied to the puzzle state and the other
+    solvers are terminated. Since every solver searches the whole tree, the
+    first one to run out of guesses proves the puzzle has no solution.
+    """
+    assert len(configs) > 0
+    snapshot = puzzle_state.snapshot()
+    with multiprocessing.Pool(processes=processes or len(configs)) as pool:
+        # Leaving the with block terminates the solvers still running
+        for solution_state, solution in pool.imap_unordered(
+            _solve_with_config, [(snapshot, c) for c in configs]
+        ):
+            if solution is not None:
+                puzzle_state.restore(solution)
+            return solution_state
+
+    assert False  # Every config produces a result
+
+
+def _solve_with_config(
+    task: typing.Tuple[model.PuzzleSnapshot, SolverConfig],
+) -> _Result:
+    snapshot, config = task
+    state = model.PuzzleState(1, 1)
+    state.restore(snapshot)
+    solution_state = solver.Solver(
+        puzzle_state=state,
+        heuristic=config.heuristic,
+        rule_order=config.rule_order,
+        seed=config.seed,
+        probe_budget=config.probe_budget,
+        sweep=config.sweep,
+        pattern_table=config.pattern_table,
+    ).solve()
+    if solution_state != validator.SolutionValue.SOLVED:
+        return solution_state, None
+    return solution_state, state.snapshot()
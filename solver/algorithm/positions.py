@@ -24,6 +24,7 @@ class GuessCandidate:
     direction: LineDirection
     x: int
     y: int
+    state: model.LineState = model.LineState.LINE
 
 
 class Vertex:
@@ -73,28 +74,18 @@ class Vertex:
 
     @property
     def count_lines(self) -> int:
-        return self._count_adjacent_edges(model.LineState.LINE)
+        state = self._puzzle_state
+        return state.line_counts[self.y * state.width + self.x]
 
     @property
     def count_any(self) -> int:
-        return self._count_adjacent_edges(model.LineState.ANY)
+        state = self._puzzle_state
+        return state.any_counts[self.y * state.width + self.x]
 
     @property
     def is_filled(self) -> bool:
         return self.count_any == 0
 
-    def _count_adjacent_edges(self, state: model.LineState) -> int:
-        lines = 0
-        if self.line_up == state:
-            lines += 1
-        if self.line_down == state:
-            lines += 1
-        if self.line_left == state:
-            lines += 1
-        if self.line_right == state:
-            lines += 1
-        return lines
-
     @property
     def is_corner(self) -> bool:
         if self.count_lines != 2:
@@ -174,15 +165,57 @@ class Vertex:
 
 
 class AffectedPositions:
+    """Finds the vertices to serve again once a line is set.
+
+    These only depend on the tile types, which can't change while solving, so
+    the vertices for every edge of the board are worked out once by load().
+    """
 
     def __init__(self, puzzle_state: model.PuzzleState):
         self._puzzle_state = puzzle_state
+        self._size = (0, 0)
+        self._tiles = b""
+        self._hlines: list[typing.Tuple[SolverPosition, ...]] = []
+        self._vlines: list[typing.Tuple[SolverPosition, ...]] = []
+
+    def load(self) -> None:
+        width = self._puzzle_state.width
+        height = self._puzzle_state.height
+        tiles = self._puzzle_state.tile_codes
+        if self._size == (width, height) and tiles == self._tiles:
+            # Nothing the tables depend on has changed
+            return
+        self._size = (width, height)
+        self._tiles = bytes(tiles)
+        self._hlines = [
+            tuple(self._tile_and_adjacent(x, y) | self._tile_and_adjacent(x + 1, y))
+            for y in range(height)
+            for x in range(width - 1)
+        ]
+        self._vlines = [
+            tuple(self._tile_and_adjacent(x, y) | self._tile_and_adjacent(x, y + 1))
+            for y in range(height - 1)
+            for x in range(width)
+        ]
+
+    def hline_tiles(self, x: int, y: int) -> typing.Tuple[SolverPosition, ...]:
+        self._ensure_loaded()
+        return self._hlines[y * (self._size[0] - 1) + x]
+
+    def vline_tiles(self, x: int, y: int) -> typing.Tuple[SolverPosition, ...]:
+        self._ensure_loaded()
+        return self._vlines[y * self._size[0] + x]
 
     def tiles_for_hline(self, x: int, y: int) -> set[SolverPosition]:
-        return self._tile_and_adjacent(x, y).union(self._tile_and_adjacent(x + 1, y))
+        return set(self.hline_tiles(x, y))
 
     def tiles_for_vline(self, x: int, y: int) -> set[SolverPosition]:
-        return self._tile_and_adjacent(x, y).union(self._tile_and_adjacent(x, y + 1))
+        return set(self.vline_tiles(x, y))
+
+    def _ensure_loaded(self) -> None:
+        # A board that was resized since loading can't have the same tables
+        if self._size != (self._puzzle_state.width, self._puzzle_state.height):
+            self.load()
 
     def _tile_and_adjacent(
         self, x: int, y: int, prevent_recurse: bool = False
@@ -0,0 +1,159 @@
+import multiprocessing
+import multiprocessing.pool
+from multiprocessing import shared_memory
+import typing
+from solver import model
+from . import conflicts, connectivity, solver
+
+
+# The lines decided by probing one state of an edge, or None if it failed
+ProbeResult = typing.Optional[dict[connectivity.Edge, model.LineState]]
+
+# The results of probing LINE and EMPTY on an edge, along with the number of
+# vertices served doing so
+ProbeOutcome = typing.Tuple[ProbeResult, ProbeResult, int]
+
+_Task = typing.Tuple[int, connectivity.Edge]
+
+
+class ProbePool:
+    """Probes edges across a process pool.
+
+    Each worker keeps a solver of its own for as long as the pool runs. The
+    board is written to shared memory whenever it has changed since the last
+    batch, and each worker brings its solver up to date with it before the
+    first probe it runs on it. When the new board only adds lines, those are
+    all that get propagated. Probes then set their edge, propagate and undo
+    the trail, the same as probing in the solver's own process.
+    """
+
+    def __init__(self, puzzle_state: model.PuzzleState, processes: int):
+        self._state = puzzle_state
+        self.processes = processes
+        self._board: typing.Optional[shared_memory.SharedMemory] = None
+        self._pool: typing.Optional[multiprocessing.pool.Pool] = None
+        # Bumped whenever a different board is written to shared memory
+        self._generation = 0
+        self._written: typing.Optional[bytes] = None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        if self._board is not None:
+            self._board.close()
+            self._board.unlink()
+            self._board = None
+        self._written = None
+
+    def probe(self, edges: typing.Sequence[connectivity.Edge]) -> list[ProbeOutcome]:
+        """Returns the results of probing LINE and EMPTY for each edge.
+
+        The pool is started on first use and runs until closed.
+        """
+        if self._pool is None:
+            self._open()
+        assert self._board is not None and self._pool is not None
+        board = bytes(
+            self._state.tile_codes + self._state.hline_codes + self._state.vline_codes
+        )
+        if board != self._written:
+            self._generation += 1
+            self._board.buf[: len(board)] = board
+            self._written = board
+        return self._pool.map(_probe_edge, [(self._generation, e) for e in edges])
+
+    def _open(self) -> None:
+        width = self._state.width
+        height = self._state.height
+        size = width * height + (width - 1) * height + width * (height - 1)
+        self._board = shared_memory.SharedMemory(create=True, size=size)
+        self._pool = multiprocessing.Pool(
+            processes=self.processes,
+            initializer=_attach,
+            initargs=(self._board.name, width, height),
+        )
+
+
+class _Worker:
+
+    def __init__(self, board: shared_memory.SharedMemory, width: int, height: int):
+        self.board = board
+        self.puzzle_state = model.PuzzleState(width, height)
+        self.solver = solver.Solver(puzzle_state=self.puzzle_state)
+        self.generation = 0
+        self.consistent = False
+
+    def sync(self, generation: int) -> None:
+        if generation == self.generation:
+            return
+
+        state = self.puzzle_state
+        tiles = state.width * state.height
+        hlines = (state.width - 1) * state.height
+        vlines = state.width * (state.height - 1)
+        board = bytes(self.board.buf[: tiles + hlines + vlines])
+        snapshot = model.PuzzleSnapshot(
+            width=state.width,
+            height=state.height,
+            tiles=board[:tiles],
+            hlines=board[tiles : tiles + hlines],
+            vlines=board[tiles + hlines :],
+        )
+        lines = self._added_lines(snapshot)
+        if lines is not None:
+            # The search went deeper, so only the new lines need propagating
+            self.consistent = self.solver.extend_probing(lines)
+        else:
+            if self.generation != 0:
+                self.solver.stop_probing()
+            state.restore(snapshot)
+            self.consistent = self.solver.start_probing()
+        self.generation = generation
+
+    def _added_lines(
+        self, snapshot: model.PuzzleSnapshot
+    ) -> typing.Optional[list[conflicts.Literal]]:
+        # The lines set on the snapshot that are still ANY here, or None if
+        # it can't be reached from this board by setting lines
+        if self.generation == 0 or not self.consistent:
+            return None
+        state = self.puzzle_state
+        if snapshot.tiles != state.tile_codes:
+            return None
+        lines: list[conflicts.Literal] = []
+        for horizontal, old, new in (
+            (True, state.hline_codes, snapshot.hlines),
+            (False, state.vline_codes, snapshot.vlines),
+        ):
+            width = state.width - 1 if horizontal else state.width
+            for i, (old_code, new_code) in enumerate(zip(old, new)):
+                if old_code == new_code:
+                    continue
+                if old_code != model.LineState.ANY.value:
+                    return None
+                y, x = divmod(i, width)
+                lines.append((horizontal, x, y, model.LineState(new_code)))
+        return lines
+
+
+# The worker of this process, set up once when the pool starts it
+_worker: typing.Optional[_Worker] = None
+
+
+def _attach(name: str, width: int, height: int) -> None:
+    global _worker
+    _worker = _Worker(shared_memory.SharedMemory(name=name), width, height)
+
+
+def _probe_edge(task: _Task) -> ProbeOutcome:
+    generation, edge = task
+    assert _worker is not None
+    _worker.sync(generation)
+    if not _worker.consistent:
+        # The board itself has no solution, so neither state can work
+        return None, None, 0
+    line, line_served = _worker.solver.probe(edge, model.LineState.LINE)
+    empty, empty_served = _worker.solver.probe(edge, model.LineState.EMPTY)
+    return line, empty, line_served + empty_served
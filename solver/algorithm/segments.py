@@ -0,0 +1,219 @@
+from dataclasses import dataclass
+import typing
+from solver import model
+from . import positions
+
+
+_NO_PARTNER = -1
+
+
+@dataclass
+class _SegmentChange:
+    trail_index: int
+    a: int
+    b: int
+    linked: bool
+    line_count: int
+    loops: int
+    loop_length: int
+    overfull: int
+    pearls_covered: int
+    # (vertex, partner, length) before the change
+    vertices: list[typing.Tuple[int, int, int]]
+
+
+class LineSegments:
+    """Tracks the open path segments formed by LINE edges.
+
+    Every segment end maps to the vertex at its other end, so joining two
+    segments or closing a loop is a constant time operation. The tracker reads
+    new lines from the puzzle trail and is rolled back alongside it.
+    """
+
+    def __init__(self, puzzle_state: model.PuzzleState):
+        self._state = puzzle_state
+        self._width = 0
+        self._degree: bytearray = bytearray()
+        self._partner: list[int] = []
+        self._length: list[int] = []
+        self._line_count = 0
+        self._loops = 0
+        self._loop_length = 0
+        self._overfull = 0
+        self._pearl: bytearray = bytearray()
+        self._pearl_count = 0
+        self._pearls_covered = 0
+        self._processed = 0
+        self._history: list[_SegmentChange] = []
+        self._changed_ends: set[positions.SolverPosition] = set()
+
+    @property
+    def line_count(self) -> int:
+        return self._line_count
+
+    @property
+    def loop_count(self) -> int:
+        return self._loops
+
+    @property
+    def is_valid(self) -> bool:
+        if self._overfull > 0 or self._loops > 1:
+            return False
+        return self._loops == 0 or self._loop_length == self._line_count
+
+    def segment_length(self, x: int, y: int) -> int:
+        """Returns the number of lines in the open segment ending at (x, y)."""
+        v = self._index(x, y)
+        return self._length[v] if self._degree[v] == 1 else 0
+
+    def load(self) -> None:
+        """Rebuilds the segments from the lines currently on the board."""
+        self._width = self._state.width
+        vertex_count = self._state.width * self._state.height
+        self._degree = bytearray(vertex_count)
+        self._partner = [_NO_PARTNER] * vertex_count
+        self._length = [0] * vertex_count
+        self._line_count = 0
+        self._loops = 0
+        self._loop_length = 0
+        self._overfull = 0
+        self._pearl = bytearray(vertex_count)
+        self._pearl_count = 0
+        self._pearls_covered = 0
+        for y in range(self._state.height):
+            for x in range(self._state.width):
+                if self._state.get_tile(x, y) != model.TileType.ANY:
+                    self._pearl[self._index(x, y)] = 1
+                    self._pearl_count += 1
+        self._history = []
+        for y in range(self._state.height):
+            for x in range(self._state.width - 1):
+                if self._state.get_hline(x, y) == model.LineState.LINE:
+                    self._add_line(self._index(x, y), self._index(x + 1, y), -1)
+        for y in range(self._state.height - 1):
+            for x in range(self._state.width):
+                if self._state.get_vline(x, y) == model.LineState.LINE:
+                    self._add_line(self._index(x, y), self._index(x, y + 1), -1)
+        # Lines placed before loading aren't part of the trail, so they can
+        # never be undone
+        self._history = []
+        self._changed_ends = set()
+        self._processed = self._state.trail_length
+
+    def update(self) -> set[positions.SolverPosition]:
+        """Adds any lines placed on the trail since the last update.
+
+        Returns the segment ends whose partner changed, since rules looking at
+        those ends may now apply even though no line next to them was placed.
+        """
+        self._changed_ends = set()
+        trail = self._state.trail
+        for i in range(self._processed, len(trail)):
+            horizontal, x, y, previous = trail[i]
+            if previous == model.LineState.LINE:
+                continue
+            if horizontal:
+                if self._state.get_hline(x, y) == model.LineState.LINE:
+                    self._add_line(self._index(x, y), self._index(x + 1, y), i)
+            elif self._state.get_vline(x, y) == model.LineState.LINE:
+                self._add_line(self._index(x, y), self._index(x, y + 1), i)
+        self._processed = len(trail)
+        return self._changed_ends
+
+    def undo(self, trail_length: int) -> None:
+        """Removes the lines recorded at or after the given trail length."""
+        while len(self._history) > 0 and self._history[-1].trail_index >= trail_length:
+            change = self._history.pop()
+            self._line_count = change.line_count
+            self._loops = change.loops
+            self._loop_length = change.loop_length
+            self._overfull = change.overfull
+            self._pearls_covered = change.pearls_covered
+            if change.linked:
+                self._degree[change.a] -= 1
+                self._degree[change.b] -= 1
+            for v, partner, length in change.vertices:
+                self._partner[v] = partner
+                self._length[v] = length
+        self._processed = min(self._processed, trail_length)
+
+    def other_end(self, x: int, y: int) -> typing.Optional[positions.SolverPosition]:
+        """Returns the far end of the open segment ending at (x, y), if any."""
+        v = self._index(x, y)
+        if self._degree[v] != 1:
+            return None
+        partner = self._partner[v]
+        return partner % self._width, partner // self._width
+
+    def closes_loop(self, a_x: int, a_y: int, b_x: int, b_y: int) -> bool:
+        """Whether a line between the two adjacent vertices would close a loop."""
+        a = self._index(a_x, a_y)
+        return self._degree[a] == 1 and self._partner[a] == self._index(b_x, b_y)
+
+    def is_premature_loop(self, a_x: int, a_y: int, b_x: int, b_y: int) -> bool:
+        """Whether a line between the two vertices would close a loop that
+        leaves out other lines or pearls."""
+        if not self.closes_loop(a_x, a_y, b_x, b_y):
+            return False
+        return (
+            self.segment_length(a_x, a_y) != self._line_count
+            or self._pearls_covered != self._pearl_count
+        )
+
+    def _index(self, x: int, y: int) -> int:
+        return y * self._width + x
+
+    def _add_line(self, a: int, b: int, trail_index: int) -> None:
+        # A third line on a vertex can't be part of any segment, so it's only
+        # counted to mark the board as invalid until it's undone
+        linked = self._degree[a] < 2 and self._degree[b] < 2
+        end_a = self._partner[a] if self._degree[a] == 1 else a
+        end_b = self._partner[b] if self._degree[b] == 1 else b
+        self._history.append(
+            _SegmentChange(
+                trail_index=trail_index,
+                a=a,
+                b=b,
+                linked=linked,
+                line_count=self._line_count,
+                loops=self._loops,
+                loop_length=self._loop_length,
+                overfull=self._overfull,
+                pearls_covered=self._pearls_covered,
+                vertices=(
+                    [
+                        (v, self._partner[v], self._length[v])
+                        for v in {a, b, end_a, end_b}
+                    ]
+                    if linked
+                    else []
+                ),
+            )
+        )
+        if not linked:
+            self._overfull += 1
+            return
+
+        for v in (a, b):
+            if self._degree[v] == 0 and self._pearl[v]:
+                self._pearls_covered += 1
+            self._degree[v] += 1
+        self._line_count += 1
+        if end_a == b:
+            self._loops += 1
+            self._loop_length = self._length[a] + 1
+            self._partner[a] = _NO_PARTNER
+            self._partner[b] = _NO_PARTNER
+            return
+
+        length = self._length[end_a] + self._length[end_b] + 1
+        if self._degree[a] == 2:
+            self._partner[a] = _NO_PARTNER
+        if self._degree[b] == 2:
+            self._partner[b] = _NO_PARTNER
+        self._partner[end_a] = end_b
+        self._partner[end_b] = end_a
+        self._length[end_a] = length
+        self._length[end_b] = length
+        self._changed_ends.add((end_a % self._width, end_a // self._width))
+        self._changed_ends.add((end_b % self._width, end_b // self._width))
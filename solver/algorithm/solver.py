@@ -1,52 +1,314 @@
+import multiprocessing
+import time
 import typing
 from solver import model
-from . import positions, validator, vertex
+from . import (
+    bitboard,
+    conflicts,
+    connectivity,
+    faces,
+    guesses,
+    heuristics,
+    patterns,
+    positions,
+    probing,
+    segments,
+    stats,
+    validator,
+    vertex,
+    worklist,
+)
 
 
 class Solver:
 
-    def __init__(self, puzzle_state: model.PuzzleState):
+    # How many of the next guesses may be probed at each choice point
+    _PROBE_CANDIDATES = 16
+
+    def __init__(
+        self,
+        puzzle_state: model.PuzzleState,
+        heuristic: typing.Type[heuristics.GuessHeuristic] = heuristics.TilePriorityGH,
+        rule_order: typing.Optional[
+            typing.Sequence[typing.Type[vertex.VertexSolver]]
+        ] = None,
+        seed: typing.Optional[int] = None,
+        probe_budget: int = 0,
+        probe_processes: typing.Optional[int] = None,
+        collect_stats: bool = False,
+        work_policy: worklist.WorkPolicy = worklist.WorkPolicy.FIFO,
+        sweep: bool = False,
+        pattern_table: bool = False,
+    ):
         self._state = puzzle_state
         self._validator = validator.SolutionValidator(puzzle_state=puzzle_state)
         self._affected = positions.AffectedPositions(puzzle_state=puzzle_state)
-        self._positions: set[positions.SolverPosition] = set()
-        self._backtrack_states: list[
-            typing.Tuple[model.PuzzleState, positions.GuessCandidate]
-        ] = []
+        self._segments = segments.LineSegments(puzzle_state=puzzle_state)
+        self._guesses = guesses.GuessQueue(
+            puzzle_state=puzzle_state,
+            heuristic=heuristic(
+                puzzle_state=puzzle_state, line_segments=self._segments
+            ),
+            seed=seed,
+        )
+        self._faces = faces.FaceColouring(puzzle_state=puzzle_state)
+        self._connectivity = connectivity.LoopConnectivity(puzzle_state=puzzle_state)
+        self._reasons = conflicts.LineReasons(puzzle_state=puzzle_state)
+        self._nogoods = conflicts.NogoodStore(
+            puzzle_state=puzzle_state, reasons=self._reasons
+        )
+        # Guess levels responsible for the most recent conflict, as a bitmask
+        self._conflict = 0
+        # Vertices served while probing each choice point before guessing.
+        # Probing is skipped when this is 0
+        self._probe_budget = probe_budget
+        # Probes run in a process pool when given a number of processes.
+        # Daemonic processes, like the workers of another pool, can't start a
+        # pool of their own, so there they probe sequentially
+        self._probe_pool = (
+            probing.ProbePool(puzzle_state=puzzle_state, processes=probe_processes)
+            if probe_processes is not None
+            and not multiprocessing.current_process().daemon
+            else None
+        )
+        self._served = 0
+        # Edges whose probe taught nothing, with the trail length at the time
+        # and the vertices the probe set lines around. Cleared on backtracking
+        self._probe_cache: dict[
+            connectivity.Edge, typing.Tuple[int, set[positions.SolverPosition]]
+        ] = {}
+        self._positions = worklist.Worklist(
+            puzzle_state=puzzle_state, policy=work_policy
+        )
+        # Trail length at each choice point, so backtracking undoes only the
+        # lines set since the guess rather than restoring the whole board. The
+        # index of a choice point is its level
+        self._backtrack_states: list[typing.Tuple[int, positions.GuessCandidate]] = []
         self._vertex_solvers: list[vertex.VertexSolver] = [
-            vertex.FillEmptyEdgesVS(puzzle_state=puzzle_state),
-            vertex.OnlyLineOptionVS(puzzle_state=puzzle_state),
-            vertex.DeadEndVS(puzzle_state=puzzle_state),
-            vertex.StraightLineTileVS(puzzle_state=puzzle_state),
-            vertex.CornerNextToStraightTileVS(puzzle_state=puzzle_state),
-            vertex.ConsecutiveStraightTilesVS(puzzle_state=puzzle_state),
-            vertex.CornerTileVS(puzzle_state=puzzle_state),
+            vertex.FillEmptyEdgesVS(puzzle_state=puzzle_state, affected=self._affected),
+            vertex.PrematureLoopVS(
+                puzzle_state=puzzle_state,
+                line_segments=self._segments,
+                affected=self._affected,
+            ),
+            vertex.OnlyLineOptionVS(puzzle_state=puzzle_state, affected=self._affected),
+            vertex.DeadEndVS(puzzle_state=puzzle_state, affected=self._affected),
+            vertex.StraightLineTileVS(
+                puzzle_state=puzzle_state, affected=self._affected
+            ),
+            vertex.CornerNextToStraightTileVS(
+                puzzle_state=puzzle_state, affected=self._affected
+            ),
+            vertex.ConsecutiveStraightTilesVS(
+                puzzle_state=puzzle_state, affected=self._affected
+            ),
+            vertex.CornerTileVS(puzzle_state=puzzle_state, affected=self._affected),
         ]
+        if rule_order is not None:
+            # Rules are tried in the given order, and any left out are skipped
+            rules = {type(r): r for r in self._vertex_solvers}
+            self._vertex_solvers = [rules[r] for r in rule_order]
+        if pattern_table:
+            # The local rules are applied through a lookup table, leaving only
+            # the rules that look beyond a vertex's neighbourhood to run
+            # directly. Neighbourhoods rarely repeat on a fresh board, so the
+            # table only pays off once it has been filled by earlier solves
+            self._vertex_solvers = [
+                patterns.LocalPatternVS(
+                    puzzle_state=puzzle_state,
+                    rules=[type(r) for r in self._vertex_solvers if r.local],
+                    affected=self._affected,
+                ),
+                *(r for r in self._vertex_solvers if not r.local),
+            ]
+        # The rules that can make updates for each type of tile, in order
+        self._rules_by_tile = {
+            tile: [r for r in self._vertex_solvers if tile in r.tile_types]
+            for tile in model.TileType
+        }
+        self._collect_stats = collect_stats
+        # Whether the simplest rules are swept across the whole board before
+        # serving vertices one at a time
+        self._sweep = sweep
+        self._stats: typing.Optional[stats.SolverStats] = None
+
+    @property
+    def stats(self) -> typing.Optional[stats.SolverStats]:
+        """Statistics from the most recent solve, if collect_stats is set."""
+        return self._stats
+
+    def solve(self) -> validator.SolutionValue:
+        """Searches for a solution, leaving it on the puzzle state.
+
+        Returns INVALID if the puzzle has no solution.
+        """
+        self._start()
+        try:
+            return self._search()
+        finally:
+            self._finish()
+
+    def count_solutions(self, limit: int = 2) -> int:
+        """Counts the solutions of the puzzle, stopping once limit are found.
+
+        The last solution found is left on the puzzle state.
+        """
+        assert limit > 0
+        solutions = 0
+        solution: typing.Optional[model.PuzzleSnapshot] = None
+        self._start()
+        try:
+            while self._search() == validator.SolutionValue.SOLVED:
+                solutions += 1
+                solution = self._state.snapshot()
+                # Treat the solution as a dead end so the search moves on to
+                # the next choice point
+                self._conflict = self._all_levels()
+                if solutions >= limit or not self._backtrack():
+                    break
+        finally:
+            self._finish()
+
+        if solution is not None:
+            self._state.restore(solution)
+        return solutions
+
+    def propagate(
+        self,
+    ) -> typing.Tuple[
+        validator.SolutionValue, typing.Optional[positions.GuessCandidate]
+    ]:
+        """Applies the rules without guessing, then returns the resulting
+        solution state along with the edge that would be guessed next."""
+        self._start()
+        try:
+            if not self._propagate():
+                return validator.SolutionValue.INVALID, None
+            solution_state = self._validator.is_solved()
+            if solution_state != validator.SolutionValue.UNSOLVED:
+                return solution_state, None
+            if not self._connectivity.is_connected():
+                return validator.SolutionValue.INVALID, None
+            return solution_state, self._guesses.best()
+        finally:
+            self._finish()
+
+    def start_probing(self) -> bool:
+        """Propagates the board and leaves the solver ready for probe().
 
-    def solve(self) -> None:
+        Returns False if propagation shows the board has no solution. Every
+        call must be matched by a call to stop_probing().
+        """
+        self._start()
+        return self._propagate()
+
+    def probe(
+        self, edge: connectivity.Edge, state: model.LineState
+    ) -> typing.Tuple[probing.ProbeResult, int]:
+        """Sets an edge to a state and propagates, then puts the board back.
+
+        Returns the lines that propagation set, or None if it failed, along
+        with the number of vertices served.
+        """
+        served = self._served
+        lines = self._probe_state(edge, state)
+        return lines, self._served - served
+
+    def extend_probing(self, lines: typing.Sequence[conflicts.Literal]) -> bool:
+        """Sets more lines on the board being probed and propagates them.
+
+        Returns False if propagation shows the board has no solution.
+        """
+        for horizontal, x, y, state in lines:
+            self._set_line(horizontal, x, y, state)
+        return self._check_global() and self._propagate()
+
+    def stop_probing(self) -> None:
+        self._finish()
+
+    def _start(self) -> None:
+        self._affected.load()
+        if self._collect_stats:
+            self._stats = stats.SolverStats()
+        for solver in self._vertex_solvers:
+            if isinstance(solver, patterns.LocalPatternVS):
+                solver.stats = self._stats
         self._load()
+        self._state.begin_trail()
+        self._segments.load()
+        self._faces.load()
+        self._guesses.load()
+        self._reasons.load()
+        self._nogoods.clear()
+        self._probe_cache = {}
 
+    def _finish(self) -> None:
+        if self._probe_pool is not None:
+            self._probe_pool.close()
+        self._state.end_trail()
+        self._backtrack_states = []
+
+    def _search(self) -> validator.SolutionValue:
         while True:
-            while len(self._positions):
-                if not self._serve():
-                    self._backtrack()
+            consistent = self._propagate()
+            if consistent:
+                solution_state = self._validator.is_solved()
+                if solution_state == validator.SolutionValue.SOLVED:
+                    return solution_state
+                if solution_state == validator.SolutionValue.INVALID:
+                    consistent = False
+                    self._conflict = self._all_levels()
 
-            solution_state = self._validator.is_solved()
-            if solution_state == validator.SolutionValue.SOLVED:
-                return
-            elif solution_state == validator.SolutionValue.INVALID:
-                self._backtrack()
-                continue
+            if consistent:
+                # Checked only at choice points, since it looks at the whole
+                # board
+                unusable = self._connectivity.unusable_edges()
+                if unusable is None:
+                    consistent = False
+                    self._conflict = self._all_levels()
+                elif len(unusable) > 0:
+                    if self._set_implied(
+                        [(h, x, y, model.LineState.EMPTY) for h, x, y in unusable]
+                    ):
+                        continue
+                    consistent = False
 
-            guesses = self._guess_candidates()
-            if len(guesses) == 0:
-                self._backtrack()
-            else:
-                guess = guesses.pop(0)
-                self._apply_guess(guess)
+            if consistent and self._probe_budget > 0:
+                implied = self._probe()
+                if implied is None:
+                    consistent = False
+                    self._conflict = self._all_levels()
+                elif len(implied) > 0:
+                    if self._set_implied(implied):
+                        continue
+                    consistent = False
+
+            if consistent:
+                guess = self._guesses.best()
+                if guess is None:
+                    consistent = False
+                    self._conflict = self._all_levels()
+                else:
+                    consistent = self._apply_guess(guess)
+
+            if not consistent and not self._backtrack():
+                return validator.SolutionValue.INVALID
+
+    def _propagate(self) -> bool:
+        # Lines deduced while loading the colouring still have to be placed
+        if not self._check_global():
+            return False
+        while True:
+            if self._sweep and not self._sweep_board():
+                return False
+            if len(self._positions) == 0:
+                return True
+            while len(self._positions):
+                if not self._serve():
+                    return False
 
     def _load(self) -> None:
-        self._positions = set()
+        self._positions.load()
         for y in range(self._state.height):
             for x in range(self._state.width):
                 if self._state.get_tile(x, y) != model.TileType.ANY:
@@ -66,16 +328,29 @@ class Solver:
 
     def _serve(self) -> bool:
         (x, y) = self._positions.pop()
+        self._served += 1
+        if self._stats is not None:
+            self._stats.positions_served += 1
         tile = self._state.get_tile(x, y)
         assert tile is not None
         v = positions.Vertex(puzzle_state=self._state, x=x, y=y)
         if v.is_filled and v.type == model.TileType.ANY:
             return True
 
-        for solver in self._vertex_solvers:
-            updates = solver.make_updates(v)
+        trail_start = self._state.trail_length
+        for solver in self._rules_by_tile[tile]:
+            if self._stats is None:
+                updates = solver.make_updates(v)
+            else:
+                updates = self._measure(solver, v)
             if len(updates) > 0:
-                for (u_x, u_y) in updates:
+                if solver.local:
+                    self._reasons.record_around(trail_start, x, y)
+                else:
+                    self._reasons.record_levels(trail_start, self._all_levels())
+                if not self._check_global():
+                    return False
+                for u_x, u_y in updates:
                     if not self._check_node(u_x, u_y):
                         return False
                 self._positions.update(updates)
@@ -83,114 +358,284 @@ class Solver:
                 break
 
         return True
-    
-    def _check_node(self, x: int, y: int) -> bool:
-        if self._validator.validate_vertex(x, y) == validator.SolutionValue.INVALID:
+
+    def _sweep_board(self) -> bool:
+        swept = bitboard.Bitboard.from_state(self._state).sweep()
+        if swept is None:
+            self._conflict = self._all_levels()
+            return False
+        for (horizontal, x, y, state), (s_x, s_y) in swept:
+            trail_start = self._state.trail_length
+            self._set_line(horizontal, x, y, state)
+            self._reasons.record_around(trail_start, s_x, s_y)
+        if not self._check_global():
             return False
-        walk_length = self._validator.walk_nodes(x, y)
-        if walk_length is None:
+        for (horizontal, x, y, _), _ in swept:
+            if not self._check_node(x, y):
+                return False
+            if not self._check_node(*((x + 1, y) if horizontal else (x, y + 1))):
+                return False
+        return True
+
+    def _measure(
+        self, solver: vertex.VertexSolver, v: positions.Vertex
+    ) -> set[positions.SolverPosition]:
+        assert self._stats is not None
+        rule = self._stats.rule(type(solver).__name__)
+        trail_start = self._state.trail_length
+        start = time.perf_counter()
+        updates = solver.make_updates(v)
+        rule.seconds += time.perf_counter() - start
+        rule.invocations += 1
+        if len(updates) > 0:
+            rule.hits += 1
+        rule.edges_set += self._state.trail_length - trail_start
+        return updates
+
+    def _check_node(self, x: int, y: int) -> bool:
+        if self._validator.validate_vertex(x, y) != validator.SolutionValue.INVALID:
             return True
-        
-        return self._validator.discover_lines() == walk_length
+        self._conflict = self._reasons.around(x, y)
+        return False
 
-    def _guess_candidates(self) -> list[positions.GuessCandidate]:
-        candidates: dict[positions.GuessCandidate, int] = {}
-        for y in range(self._state.height):
-            for x in range(self._state.width):
-                vertex = positions.Vertex(puzzle_state=self._state, x=x, y=y)
-                if vertex.is_filled:
-                    continue
-
-                for c, p in self._make_guess_candidates(vertex):
-                    if c not in candidates or candidates[c] < p:
-                        candidates[c] = p
-
-        sorted_candidates = [c for c in candidates]
-        sorted_candidates.sort(key=lambda c: candidates[c], reverse=True)
-        return sorted_candidates
-
-    def _make_guess_candidates(
-        self, vertex: positions.Vertex
-    ) -> list[typing.Tuple[positions.GuessCandidate, int]]:
-        if vertex.type == model.TileType.CORNER and vertex.count_lines > 0:
-            priority = positions.GuessPriority.PARTIAL_CORNER
-        elif vertex.type != model.TileType.ANY:
-            priority = positions.GuessPriority.UNKNOWN_RESTRICTIVE_TILE
-        elif vertex.count_lines > 0:
-            priority = positions.GuessPriority.PARTIAL_ANY_TILE
-        else:
-            priority = positions.GuessPriority.REMAINING
-
-        candidates: list[typing.Tuple[positions.GuessCandidate, int]] = []
-        if vertex.line_up == model.LineState.ANY:
-            candidates.append(
-                (
-                    positions.GuessCandidate(
-                        direction=positions.LineDirection.VERTICAL,
-                        x=vertex.x,
-                        y=vertex.y - 1,
-                    ),
-                    priority,
-                )
+    def _check_global(self) -> bool:
+        while self._check_segments():
+            trail_start = self._state.trail_length
+            deductions = self._faces.update()
+            if not self._faces.is_valid:
+                # Like loops, the colouring spans the whole board
+                self._conflict = self._all_levels()
+                return False
+            if len(deductions) == 0:
+                return True
+            for horizontal, x, y, state in deductions:
+                self._set_line(horizontal, x, y, state)
+            self._reasons.record_levels(trail_start, self._all_levels())
+
+        return False
+
+    def _check_segments(self) -> bool:
+        ends = self._segments.update()
+        self._positions.update(ends)
+        self._guesses.touch(ends)
+        if self._segments.is_valid:
+            return True
+        # Loops span the whole board, so blame every guess
+        self._conflict = self._all_levels()
+        return False
+
+    def _set_implied(self, lines: list[conflicts.Literal]) -> bool:
+        trail_start = self._state.trail_length
+        for horizontal, x, y, state in lines:
+            line = (
+                self._state.get_hline(x, y)
+                if horizontal
+                else self._state.get_vline(x, y)
             )
-        if vertex.line_right == model.LineState.ANY:
-            candidates.append(
-                (
-                    positions.GuessCandidate(
-                        direction=positions.LineDirection.HORIZONTAL,
-                        x=vertex.x,
-                        y=vertex.y,
-                    ),
-                    priority,
+            if line == state:
+                continue
+            if line != model.LineState.ANY:
+                self._conflict = self._all_levels()
+                return False
+            self._set_line(horizontal, x, y, state)
+        self._reasons.record_levels(trail_start, self._all_levels())
+        return self._check_global()
+
+    def _all_levels(self) -> int:
+        return (1 << len(self._backtrack_states)) - 1
+
+    def _apply_guess(self, guess: positions.GuessCandidate) -> bool:
+        refuted = self._nogoods.refutes(self._literal(guess, guess.state))
+        trail_start = self._state.trail_length
+        if refuted is None:
+            level = len(self._backtrack_states)
+            self._backtrack_states.append((trail_start, guess))
+            if self._stats is not None:
+                self._stats.guesses += 1
+                self._stats.max_depth = max(
+                    self._stats.max_depth, len(self._backtrack_states)
                 )
+            self._place(guess, guess.state)
+            self._reasons.record_levels(trail_start, 1 << level)
+        else:
+            # A learned nogood rules the guess out, so its alternative follows
+            # from the guesses behind that nogood instead of being a new guess
+            alternative = self._alternative(guess)
+            refuted_alternative = self._nogoods.refutes(
+                self._literal(guess, alternative)
             )
-        if vertex.line_down == model.LineState.ANY:
-            candidates.append(
-                (
-                    positions.GuessCandidate(
-                        direction=positions.LineDirection.VERTICAL,
-                        x=vertex.x,
-                        y=vertex.y,
-                    ),
-                    priority,
+            if refuted_alternative is not None:
+                self._conflict = refuted | refuted_alternative
+                return False
+            self._place(guess, alternative)
+            self._reasons.record_levels(trail_start, refuted)
+
+        return self._check_global()
+
+    def _backtrack(self) -> bool:
+        conflict = self._conflict
+        while len(self._backtrack_states) > 0:
+            level = len(self._backtrack_states) - 1
+            responsible = conflict & (1 << level) != 0
+            if responsible:
+                self._nogoods.add(
+                    tuple(
+                        self._literal(g, g.state)
+                        for i, (_, g) in enumerate(self._backtrack_states)
+                        if conflict & (1 << i)
+                    )
                 )
+
+            trail_length, guess = self._backtrack_states.pop()
+            if self._stats is not None:
+                self._stats.backtracks += 1
+            self._undo(trail_length)
+            self._probe_cache = {}
+            if not responsible:
+                # The conflict happens whichever way this guess goes, so jump
+                # straight past it
+                continue
+
+            # The alternative is now implied by the other guesses behind the
+            # conflict rather than being a guess of its own
+            self._place(guess, self._alternative(guess))
+            self._reasons.record_levels(trail_length, conflict & ~(1 << level))
+            if self._check_global():
+                return True
+            conflict = self._conflict
+
+        return False
+
+    def _undo(self, trail_length: int) -> None:
+        self._guesses.undo(trail_length)
+        self._state.undo(trail_length)
+        self._segments.undo(trail_length)
+        self._faces.undo(trail_length)
+        self._positions.clear()
+
+    def _probe(self) -> typing.Optional[list[conflicts.Literal]]:
+        """Tries both states of the next few guesses, stopping at the first
+        that shows some line has to take a particular state.
+
+        Returns the lines found, or None if an edge can take neither state.
+        """
+        edges = [
+            edge
+            for edge in (
+                (g.direction == positions.LineDirection.HORIZONTAL, g.x, g.y)
+                for g in self._guesses.candidates(self._PROBE_CANDIDATES)
             )
-        if vertex.line_left == model.LineState.ANY:
-            candidates.append(
-                (
-                    positions.GuessCandidate(
-                        direction=positions.LineDirection.HORIZONTAL,
-                        x=vertex.x - 1,
-                        y=vertex.y,
-                    ),
-                    priority,
-                )
+            if not self._probe_cached(edge)
+        ]
+        # A pool probes an edge in each of its processes at once, so the
+        # budget is only checked between those chunks
+        chunk_size = 1 if self._probe_pool is None else self._probe_pool.processes
+        served = 0
+        for start in range(0, len(edges), chunk_size):
+            if served >= self._probe_budget:
+                break
+            chunk = edges[start : start + chunk_size]
+            results = (
+                self._probe_pool.probe(chunk)
+                if self._probe_pool is not None
+                else [self._probe_edge(edge) for edge in chunk]
+            )
+            for edge, (line, empty, cost) in zip(chunk, results):
+                served += cost
+                if line is None and empty is None:
+                    return None
+                if line is None:
+                    return [(*edge, model.LineState.EMPTY)]
+                if empty is None:
+                    return [(*edge, model.LineState.LINE)]
+
+                # Lines that come out the same either way
+                agreed = [
+                    (*e, state) for e, state in line.items() if empty.get(e) == state
+                ]
+                if len(agreed) > 0:
+                    return agreed
+
+                footprint: set[positions.SolverPosition] = set()
+                for horizontal, x, y in (*line, *empty):
+                    footprint.add((x, y))
+                    footprint.add((x + 1, y) if horizontal else (x, y + 1))
+                self._probe_cache[edge] = (self._state.trail_length, footprint)
+
+        return []
+
+    def _probe_edge(self, edge: connectivity.Edge) -> probing.ProbeOutcome:
+        line, line_served = self.probe(edge, model.LineState.LINE)
+        empty, empty_served = self.probe(edge, model.LineState.EMPTY)
+        return line, empty, line_served + empty_served
+
+    def _probe_state(
+        self, edge: connectivity.Edge, state: model.LineState
+    ) -> probing.ProbeResult:
+        trail_start = self._state.trail_length
+        self._set_line(*edge, state)
+        consistent = self._check_global() and self._propagate()
+        lines: dict[connectivity.Edge, model.LineState] = {}
+        trail = self._state.trail
+        for i in range(trail_start, len(trail)):
+            horizontal, x, y, _ = trail[i]
+            line = (
+                self._state.get_hline(x, y)
+                if horizontal
+                else self._state.get_vline(x, y)
             )
+            assert line is not None
+            lines[(horizontal, x, y)] = line
+        self._undo(trail_start)
+        return lines if consistent else None
+
+    def _probe_cached(self, edge: connectivity.Edge) -> bool:
+        # A probe is only repeated once a line is set next to one it set, so
+        # this is a heuristic rather than an exact cache
+        cached = self._probe_cache.get(edge)
+        if cached is None:
+            return False
+        trail_length, footprint = cached
+        trail = self._state.trail
+        for i in range(trail_length, len(trail)):
+            horizontal, x, y, _ = trail[i]
+            if (x, y) in footprint or (
+                (x + 1, y) if horizontal else (x, y + 1)
+            ) in footprint:
+                return False
+        return True
+
+    def _alternative(self, guess: positions.GuessCandidate) -> model.LineState:
+        return (
+            model.LineState.EMPTY
+            if guess.state == model.LineState.LINE
+            else model.LineState.LINE
+        )
 
-        return candidates
+    def _literal(
+        self, guess: positions.GuessCandidate, state: model.LineState
+    ) -> conflicts.Literal:
+        return (
+            guess.direction == positions.LineDirection.HORIZONTAL,
+            guess.x,
+            guess.y,
+            state,
+        )
 
-    def _apply_guess(self, guess: positions.GuessCandidate) -> None:
-        snapshot = model.PuzzleState(1, 1)
-        snapshot.apply(self._state)
-        self._backtrack_states.append((snapshot, guess))
+    def _place(self, guess: positions.GuessCandidate, state: model.LineState) -> None:
+        self._set_line(
+            guess.direction == positions.LineDirection.HORIZONTAL,
+            guess.x,
+            guess.y,
+            state,
+        )
 
-        if guess.direction == positions.LineDirection.HORIZONTAL:
-            self._state.set_hline(guess.x, guess.y, model.LineState.LINE)
-            self._positions.update(self._affected.tiles_for_hline(guess.x, guess.y))
-        elif guess.direction == positions.LineDirection.VERTICAL:
-            self._state.set_vline(guess.x, guess.y, model.LineState.LINE)
-            self._positions.update(self._affected.tiles_for_vline(guess.x, guess.y))
+    def _set_line(
+        self, horizontal: bool, x: int, y: int, state: model.LineState
+    ) -> None:
+        if horizontal:
+            self._state.set_hline(x, y, state)
+            self._positions.update(self._affected.hline_tiles(x, y))
         else:
-            assert False  # Avoid a potential infinite loop
-
-    def _backtrack(self) -> None:
-        snapshot, guess = self._backtrack_states.pop()
-        self._state.apply(snapshot)
-        self._positions = set()
-
-        if guess.direction == positions.LineDirection.HORIZONTAL:
-            self._state.set_hline(guess.x, guess.y, model.LineState.EMPTY)
-            self._positions.update(self._affected.tiles_for_hline(guess.x, guess.y))
-        elif guess.direction == positions.LineDirection.VERTICAL:
-            self._state.set_vline(guess.x, guess.y, model.LineState.EMPTY)
-            self._positions.update(self._affected.tiles_for_vline(guess.x, guess.y))
+            self._state.set_vline(x, y, state)
+            self._positions.update(self._affected.vline_tiles(x, y))
@@ -0,0 +1,32 @@
+from dataclasses import asdict, dataclass, field
+import json
+
+
+@dataclass
+class RuleStats:
+    """What a vertex rule did over a solve.
+
+    Only time actually spent is counted. Rules applied through a lookup table
+    are credited with the hits and lines of each lookup, but their
+    invocations and time are charged to the table itself.
+    """
+
+    invocations: int = 0
+    hits: int = 0
+    edges_set: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class SolverStats:
+    rules: dict[str, RuleStats] = field(default_factory=dict)
+    positions_served: int = 0
+    guesses: int = 0
+    backtracks: int = 0
+    max_depth: int = 0
+
+    def rule(self, name: str) -> RuleStats:
+        return self.rules.setdefault(name, RuleStats())
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
@@ -0,0 +1,313 @@
+import typing
+import numpy
+import numpy.typing
+from solver import model
+from . import validator
+
+
+# A layer of the board, holding the enum value of each tile or line in rows.
+# A stack of layers has the board as its first axis
+Layer = numpy.typing.NDArray[numpy.uint8]
+_Mask = numpy.typing.NDArray[numpy.bool_]
+
+_ANY = model.LineState.ANY.value
+_LINE = model.LineState.LINE.value
+
+# The sides of a vertex the loop can come in from
+_UP, _DOWN, _LEFT, _RIGHT = range(4)
+
+_SOLVED = validator.SolutionValue.SOLVED.value
+_UNSOLVED = validator.SolutionValue.UNSOLVED.value
+_INVALID = validator.SolutionValue.INVALID.value
+
+
+class VectorizedValidator:
+    """Checks a board held as NumPy arrays, giving the same results as
+    SolutionValidator.
+
+    Every vertex is validated at once through whole-array operations, so only
+    the walk around the loop runs in Python.
+    """
+
+    def __init__(self, tiles: Layer, hlines: Layer, vlines: Layer):
+        height, width = tiles.shape[-2:]
+        assert hlines.shape[-2:] == (height, width - 1)
+        assert vlines.shape[-2:] == (height - 1, width)
+        self._tiles = tiles
+        self._hlines = hlines
+        self._vlines = vlines
+
+    @classmethod
+    def from_state(cls, puzzle_state: model.PuzzleState) -> "VectorizedValidator":
+        width = puzzle_state.width
+        height = puzzle_state.height
+        return cls(
+            tiles=_layer(puzzle_state.tile_codes, height, width),
+            hlines=_layer(puzzle_state.hline_codes, height, width - 1),
+            vlines=_layer(puzzle_state.vline_codes, height - 1, width),
+        )
+
+    def validate_vertices(self) -> Layer:
+        """Returns the SolutionValue of every vertex, as its enum value."""
+        return _validate_vertices(self._tiles, self._hlines, self._vlines)
+
+    def is_solved(self) -> validator.SolutionValue:
+        solution_state, _ = validate_many(
+            self._tiles[numpy.newaxis],
+            self._hlines[numpy.newaxis],
+            self._vlines[numpy.newaxis],
+        )[0]
+        return solution_state
+
+
+# The SolutionValue of a board, along with the first vertex in row-major
+# order that stops it being solved, if it's INVALID
+BoardResult = typing.Tuple[
+    validator.SolutionValue, typing.Optional[typing.Tuple[int, int]]
+]
+
+
+def validate_many(tiles: Layer, hlines: Layer, vlines: Layer) -> list[BoardResult]:
+    """Validates a stack of boards of the same size.
+
+    The layers are stacked along their first axis, so for N boards of width W
+    and height H, tiles is N x H x W, hlines N x H x (W - 1) and vlines
+    N x (H - 1) x W. Every vertex of every board is validated at once, and
+    only the boards that get as far as walking their loop are looked at one
+    by one.
+
+    The vertex given for an INVALID board is the first that
+    SolutionValidator.validate_vertex finds INVALID. If there is none, it is
+    the first vertex still UNSOLVED, or else the first with a line that
+    isn't on the loop.
+    """
+    boards, height, width = tiles.shape
+    values = _validate_vertices(tiles, hlines, vlines).reshape(boards, height * width)
+    invalid = values == _INVALID
+    unsolved = values == _UNSOLVED
+    counts = _line_counts(hlines, vlines)
+    line_totals = (counts.reshape(boards, height * width).sum(axis=1) // 2).tolist()
+
+    results: list[BoardResult] = []
+    for board in range(boards):
+        if invalid[board].any():
+            results.append(
+                (
+                    validator.SolutionValue.INVALID,
+                    _position(int(invalid[board].argmax()), width),
+                )
+            )
+            continue
+
+        walk = _walk_loop(hlines[board], vlines[board], counts[board])
+        if walk is None:
+            results.append((validator.SolutionValue.UNSOLVED, None))
+        elif unsolved[board].any():
+            results.append(
+                (
+                    validator.SolutionValue.INVALID,
+                    _position(int(unsolved[board].argmax()), width),
+                )
+            )
+        elif len(walk) != line_totals[board]:
+            off_loop = counts[board].ravel() > 0
+            off_loop[walk] = False
+            results.append(
+                (
+                    validator.SolutionValue.INVALID,
+                    _position(int(off_loop.argmax()), width),
+                )
+            )
+        else:
+            results.append((validator.SolutionValue.SOLVED, None))
+
+    return results
+
+
+def _position(vertex: int, width: int) -> typing.Tuple[int, int]:
+    y, x = divmod(vertex, width)
+    return x, y
+
+
+def _layer(codes: bytearray, height: int, width: int) -> Layer:
+    return numpy.frombuffer(bytes(codes), dtype=numpy.uint8).reshape(height, width)
+
+
+def _validate_vertices(tiles: Layer, hlines: Layer, vlines: Layer) -> Layer:
+    # The lines above, below, left and right of each vertex, with 0 for those
+    # off the board
+    up = _pad(vlines, top=1)
+    down = _pad(vlines, bottom=1)
+    left = _pad(hlines, left=1)
+    right = _pad(hlines, right=1)
+
+    line_up = up == _LINE
+    line_down = down == _LINE
+    line_left = left == _LINE
+    line_right = right == _LINE
+    lines = line_up.astype(numpy.uint8) + line_down + line_left + line_right
+    anys = (
+        (up == _ANY).astype(numpy.uint8)
+        + (down == _ANY)
+        + (left == _ANY)
+        + (right == _ANY)
+    )
+    may_up = line_up | (up == _ANY)
+    may_down = line_down | (down == _ANY)
+    may_left = line_left | (left == _ANY)
+    may_right = line_right | (right == _ANY)
+
+    two_lines = lines == 2
+    is_corner = two_lines & (line_up != line_down)
+    is_straight = two_lines & (line_up == line_down)
+    may_be_corner = ~is_straight & (may_left | may_right) & (may_up | may_down)
+    may_be_straight = ~is_corner & ((may_left & may_right) | (may_up & may_down))
+
+    invalid = ((anys == 0) & (lines != 0) & ~two_lines) | (lines > 2)
+
+    # A corner has to go straight on through the next vertex in each
+    # direction it leaves in
+    corner_invalid = (
+        ~may_be_corner
+        | (line_up & ~(_shift(may_be_straight, -1, 0) & _shift(may_up, -1, 0)))
+        | (line_down & ~(_shift(may_be_straight, 1, 0) & _shift(may_down, 1, 0)))
+        | (line_left & ~(_shift(may_be_straight, 0, -1) & _shift(may_left, 0, -1)))
+        | (line_right & ~(_shift(may_be_straight, 0, 1) & _shift(may_right, 0, 1)))
+    )
+
+    # A straight has to turn on at least one of the vertices either side
+    exists = numpy.ones(tiles.shape, dtype=numpy.bool_)
+    straight_invalid = (
+        ~may_be_straight
+        | (
+            (line_up | line_down)
+            & _straight_invalid(
+                _shift(exists, -1, 0),
+                _shift(exists, 1, 0),
+                _shift(may_be_corner, -1, 0),
+                _shift(may_be_corner, 1, 0),
+                _shift(is_straight, -1, 0),
+                _shift(is_straight, 1, 0),
+            )
+        )
+        | (
+            (line_left | line_right)
+            & _straight_invalid(
+                _shift(exists, 0, -1),
+                _shift(exists, 0, 1),
+                _shift(may_be_corner, 0, -1),
+                _shift(may_be_corner, 0, 1),
+                _shift(is_straight, 0, -1),
+                _shift(is_straight, 0, 1),
+            )
+        )
+    )
+
+    corner = tiles == model.TileType.CORNER.value
+    straight = tiles == model.TileType.STRAIGHT.value
+    invalid |= (corner & corner_invalid) | (straight & straight_invalid)
+    # Pearls are only solved once the loop passes through them
+    solved = numpy.where(corner | straight, two_lines, two_lines | (lines == 0))
+    values: Layer = numpy.where(
+        invalid, _INVALID, numpy.where(solved, _SOLVED, _UNSOLVED)
+    ).astype(numpy.uint8)
+    return values
+
+
+def _straight_invalid(
+    before_exists: _Mask,
+    after_exists: _Mask,
+    before_may_be_corner: _Mask,
+    after_may_be_corner: _Mask,
+    before_is_straight: _Mask,
+    after_is_straight: _Mask,
+) -> _Mask:
+    return (
+        ~before_exists
+        | ~after_exists
+        | (~before_may_be_corner & ~after_may_be_corner)
+        | (before_is_straight & ~after_may_be_corner)
+        | (after_is_straight & ~before_may_be_corner)
+    )
+
+
+def _pad(
+    layer: Layer, top: int = 0, bottom: int = 0, left: int = 0, right: int = 0
+) -> Layer:
+    widths = [(0, 0)] * (layer.ndim - 2) + [(top, bottom), (left, right)]
+    padded: Layer = numpy.pad(layer, widths)
+    return padded
+
+
+def _shift(mask: _Mask, dy: int, dx: int) -> _Mask:
+    # The value at the vertex (x + dx, y + dy) for each vertex, or False when
+    # that vertex is off the board
+    height, width = mask.shape[-2:]
+    shifted = numpy.zeros_like(mask)
+    shifted[
+        ...,
+        max(-dy, 0) : height - max(dy, 0),
+        max(-dx, 0) : width - max(dx, 0),
+    ] = mask[
+        ...,
+        max(dy, 0) : height - max(-dy, 0),
+        max(dx, 0) : width - max(-dx, 0),
+    ]
+    return shifted
+
+
+def _line_counts(hlines: Layer, vlines: Layer) -> Layer:
+    # How many lines there are around each vertex
+    counts: Layer = (
+        (_pad(hlines, left=1) == _LINE).astype(numpy.uint8)
+        + (_pad(hlines, right=1) == _LINE)
+        + (_pad(vlines, top=1) == _LINE)
+        + (_pad(vlines, bottom=1) == _LINE)
+    )
+    return counts
+
+
+def _walk_loop(
+    hlines: Layer, vlines: Layer, counts: Layer
+) -> typing.Optional[list[int]]:
+    """Follows the lines from the first horizontal line until they come back
+    to it, returning the row-major index of each vertex passed through.
+
+    Returns None if there is no horizontal line, or the lines don't close up.
+    Without a horizontal line there can't be a loop either.
+    """
+    height, width = counts.shape
+    starts = numpy.flatnonzero(hlines == _LINE)
+    if len(starts) == 0:
+        return None
+    start_y, start_x = divmod(int(starts[0]), width - 1)
+
+    hline = (hlines == _LINE).ravel().tolist()
+    vline = (vlines == _LINE).ravel().tolist()
+    # A vertex only continues the loop with exactly two lines around it
+    degree = counts.ravel().tolist()
+
+    # Walk right along the first line, remembering which side each step came
+    # in from so the walk never turns back
+    x, y = start_x + 1, start_y
+    came_from = _LEFT
+    walked = [start_y * width + x]
+    while (x, y) != (start_x, start_y):
+        if degree[y * width + x] != 2:
+            return None
+        if came_from != _LEFT and x > 0 and hline[y * (width - 1) + x - 1]:
+            x -= 1
+            came_from = _RIGHT
+        elif came_from != _RIGHT and x < width - 1 and hline[y * (width - 1) + x]:
+            x += 1
+            came_from = _LEFT
+        elif came_from != _UP and y > 0 and vline[(y - 1) * width + x]:
+            y -= 1
+            came_from = _DOWN
+        else:
+            assert y < height - 1
+            y += 1
+            came_from = _UP
+        walked.append(y * width + x)
+
+    return walked
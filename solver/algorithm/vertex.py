@@ -1,15 +1,28 @@
 import abc
 import typing
 from solver import model
-from . import positions
+from . import positions, segments
 
 
 class VertexSolver(abc.ABC):
 
-    def __init__(self, puzzle_state: model.PuzzleState):
+    # Whether the rule only looks at vertices within two steps of the one it
+    # is given. Lines set by other rules are treated as depending on every guess
+    local: bool = True
+    # The tile types of the vertices the rule can make updates for
+    tile_types: typing.FrozenSet[model.TileType] = frozenset(model.TileType)
+
+    def __init__(
+        self,
+        puzzle_state: model.PuzzleState,
+        affected: typing.Optional[positions.AffectedPositions] = None,
+    ):
         self.puzzle_state = puzzle_state
-        self.affected: positions.AffectedPositions = positions.AffectedPositions(
-            puzzle_state=puzzle_state
+        # Rules on the same board can share the tables of affected positions
+        self.affected: positions.AffectedPositions = (
+            affected
+            if affected is not None
+            else positions.AffectedPositions(puzzle_state=puzzle_state)
         )
 
     @abc.abstractmethod
@@ -86,6 +99,8 @@ class OnlyLineOptionVS(VertexSolver):
 
 class StraightLineTileVS(VertexSolver):
 
+    tile_types = frozenset({model.TileType.STRAIGHT})
+
     def make_updates(self, vertex: positions.Vertex) -> set[positions.SolverPosition]:
         if vertex.type != model.TileType.STRAIGHT or vertex.count_lines == 2:
             return set()
@@ -191,6 +206,8 @@ class CornerNextToStraightTileVS(VertexSolver):
 
 class ConsecutiveStraightTilesVS(VertexSolver):
 
+    tile_types = frozenset({model.TileType.STRAIGHT})
+
     def make_updates(self, vertex: positions.Vertex) -> set[positions.SolverPosition]:
         if vertex.type != model.TileType.STRAIGHT:
             return set()
@@ -247,6 +264,8 @@ class ConsecutiveStraightTilesVS(VertexSolver):
 
 class CornerTileVS(VertexSolver):
 
+    tile_types = frozenset({model.TileType.CORNER})
+
     def make_updates(self, vertex: positions.Vertex) -> set[positions.SolverPosition]:
         if vertex.type != model.TileType.CORNER:
             return set()
@@ -439,3 +458,43 @@ class CornerTileVS(VertexSolver):
 
         self.puzzle_state.set_hline(vertex.x, vertex.y, model.LineState.EMPTY)
         return self.affected.tiles_for_hline(vertex.x, vertex.y)
+
+
+class PrematureLoopVS(VertexSolver):
+
+    local = False
+
+    def __init__(
+        self,
+        puzzle_state: model.PuzzleState,
+        line_segments: segments.LineSegments,
+        affected: typing.Optional[positions.AffectedPositions] = None,
+    ):
+        super().__init__(puzzle_state=puzzle_state, affected=affected)
+        self.line_segments = line_segments
+
+    def make_updates(self, vertex: positions.Vertex) -> set[positions.SolverPosition]:
+        end = self.line_segments.other_end(vertex.x, vertex.y)
+        if end is None:
+            return set()
+
+        e_x, e_y = end
+        if abs(e_x - vertex.x) + abs(e_y - vertex.y) != 1:
+            return set()
+        if not self.line_segments.is_premature_loop(vertex.x, vertex.y, e_x, e_y):
+            return set()
+
+        if e_y < vertex.y and vertex.line_up == model.LineState.ANY:
+            self.puzzle_state.set_vline(vertex.x, vertex.y - 1, model.LineState.EMPTY)
+            return self.affected.tiles_for_vline(vertex.x, vertex.y - 1)
+        elif e_y > vertex.y and vertex.line_down == model.LineState.ANY:
+            self.puzzle_state.set_vline(vertex.x, vertex.y, model.LineState.EMPTY)
+            return self.affected.tiles_for_vline(vertex.x, vertex.y)
+        elif e_x < vertex.x and vertex.line_left == model.LineState.ANY:
+            self.puzzle_state.set_hline(vertex.x - 1, vertex.y, model.LineState.EMPTY)
+            return self.affected.tiles_for_hline(vertex.x - 1, vertex.y)
+        elif e_x > vertex.x and vertex.line_right == model.LineState.ANY:
+            self.puzzle_state.set_hline(vertex.x, vertex.y, model.LineState.EMPTY)
+            return self.affected.tiles_for_hline(vertex.x, vertex.y)
+
+        return set()
@@ -0,0 +1,97 @@
+import enum
+import typing
+from solver import model
+from . import positions
+
+
+class WorkPolicy(enum.Enum):
+    FIFO = 1
+    PEARLS_FIRST = 2
+
+
+class _Ring:
+
+    def __init__(self, capacity: int):
+        self.items = [0] * capacity
+        self.head = 0
+        self.count = 0
+
+    def push(self, item: int) -> None:
+        self.items[(self.head + self.count) % len(self.items)] = item
+        self.count += 1
+
+    def pop(self) -> int:
+        item = self.items[self.head]
+        self.head = (self.head + 1) % len(self.items)
+        self.count -= 1
+        return item
+
+    def queued(self) -> typing.Iterator[int]:
+        for i in range(self.count):
+            yield self.items[(self.head + i) % len(self.items)]
+
+
+class Worklist:
+    """The vertices waiting to be served by the solver.
+
+    Vertices are queued by index in ring buffers, and a bytearray marks the
+    ones already queued so each is held at most once. Vertices are served in
+    the order they were queued, except that with PEARLS_FIRST any queued
+    pearl is served before the other vertices.
+    """
+
+    def __init__(
+        self, puzzle_state: model.PuzzleState, policy: WorkPolicy = WorkPolicy.FIFO
+    ):
+        self._state = puzzle_state
+        self._policy = policy
+        self._width = 0
+        self._queued = bytearray()
+        self._pearl = bytearray()
+        self._pearls = _Ring(0)
+        self._others = _Ring(0)
+
+    def __len__(self) -> int:
+        return self._pearls.count + self._others.count
+
+    def load(self) -> None:
+        """Empties the worklist and sizes it for the current board."""
+        self._width = self._state.width
+        vertex_count = self._state.width * self._state.height
+        self._queued = bytearray(vertex_count)
+        self._pearl = bytearray(vertex_count)
+        if self._policy == WorkPolicy.PEARLS_FIRST:
+            for i, tile in enumerate(self._state.tile_codes):
+                if tile != model.TileType.ANY.value:
+                    self._pearl[i] = 1
+        # Each vertex is queued at most once, so the rings can never overflow
+        self._pearls = _Ring(vertex_count)
+        self._others = _Ring(vertex_count)
+
+    def clear(self) -> None:
+        for ring in (self._pearls, self._others):
+            for v in ring.queued():
+                self._queued[v] = 0
+            ring.head = 0
+            ring.count = 0
+
+    def add(self, position: positions.SolverPosition) -> None:
+        x, y = position
+        v = y * self._width + x
+        if self._queued[v]:
+            return
+        self._queued[v] = 1
+        if self._pearl[v]:
+            self._pearls.push(v)
+        else:
+            self._others.push(v)
+
+    def update(self, vertices: typing.Iterable[positions.SolverPosition]) -> None:
+        for position in vertices:
+            self.add(position)
+
+    def pop(self) -> positions.SolverPosition:
+        v = self._pearls.pop() if self._pearls.count > 0 else self._others.pop()
+        self._queued[v] = 0
+        y, x = divmod(v, self._width)
+        return x, y
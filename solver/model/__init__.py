@@ -1,5 +1,7 @@
 from .puzzle import (
     TileType as TileType,
+    PuzzleSnapshot as PuzzleSnapshot,
     PuzzleState as PuzzleState,
     LineState as LineState,
+    TrailEntry as TrailEntry,
 )
@@ -1,4 +1,6 @@
+from dataclasses import dataclass
 import enum
+import random
 import typing
 
 
@@ -14,14 +16,83 @@ class LineState(enum.Enum):
     EMPTY = 3
 
 
+# Each layer is stored as a flat bytearray of enum values, so these tables map a
+# stored code back to its enum member without going through the enum machinery
+_TILE_TYPES: typing.Tuple[typing.Optional[TileType], ...] = (
+    None,
+    TileType.ANY,
+    TileType.CORNER,
+    TileType.STRAIGHT,
+)
+_LINE_STATES: typing.Tuple[typing.Optional[LineState], ...] = (
+    None,
+    LineState.ANY,
+    LineState.LINE,
+    LineState.EMPTY,
+)
+
+_ANY = LineState.ANY.value
+_LINE = LineState.LINE.value
+
+
+# Random keys for Zobrist hashing, one for every code at every position of each
+# layer. The key for code c at position i of a layer is at index 4 * i + c
+@dataclass(frozen=True)
+class _ZobristKeys:
+    size: int
+    tiles: typing.Tuple[int, ...]
+    hlines: typing.Tuple[int, ...]
+    vlines: typing.Tuple[int, ...]
+
+
+_ZOBRIST_KEYS: dict[typing.Tuple[int, int], _ZobristKeys] = {}
+
+
+def _zobrist_keys(width: int, height: int) -> _ZobristKeys:
+    keys = _ZOBRIST_KEYS.get((width, height))
+    if keys is None:
+        # Seeded by the board size, so hashes agree between processes and runs
+        rng = random.Random(f"{width}x{height}")
+
+        def layer(positions: int) -> typing.Tuple[int, ...]:
+            return tuple(rng.getrandbits(64) for _ in range(4 * positions))
+
+        keys = _ZobristKeys(
+            size=rng.getrandbits(64),
+            tiles=layer(width * height),
+            hlines=layer((width - 1) * height),
+            vlines=layer(width * (height - 1)),
+        )
+        _ZOBRIST_KEYS[(width, height)] = keys
+    return keys
+
+
+# (is horizontal, x, y, previous state) for every line set while a trail is active
+TrailEntry = typing.Tuple[bool, int, int, LineState]
+
+
+@dataclass(frozen=True)
+class PuzzleSnapshot:
+    width: int
+    height: int
+    tiles: bytes
+    hlines: bytes
+    vlines: bytes
+
+
 class PuzzleState:
 
     def __init__(self, width: int, height: int):
         self._width: int = 0
         self._height: int = 0
-        self._tiles: list[list[TileType]] = []
-        self._hlines: list[list[LineState]] = []
-        self._vlines: list[list[LineState]] = []
+        self._tiles: bytearray = bytearray()
+        self._hlines: bytearray = bytearray()
+        self._vlines: bytearray = bytearray()
+        self._line_counts: bytearray = bytearray()
+        self._any_counts: bytearray = bytearray()
+        self._keys = _zobrist_keys(width, height)
+        self._hash = 0
+        self._trail: typing.Optional[list[TrailEntry]] = None
         self.reset(width, height)
 
     @property
@@ -32,62 +103,189 @@ class PuzzleState:
     def height(self) -> int:
         return self._height
 
+    # The live layers, holding the enum value of each tile or line in
+    # row-major order. They are for fast reads and must not be modified
+    @property
+    def tile_codes(self) -> bytearray:
+        return self._tiles
+
+    @property
+    def hline_codes(self) -> bytearray:
+        return self._hlines
+
+    @property
+    def vline_codes(self) -> bytearray:
+        return self._vlines
+
+    # How many of the lines around each vertex are LINE, and how many are ANY,
+    # kept up to date by the setters. Also for reads only
+    @property
+    def line_counts(self) -> bytearray:
+        return self._line_counts
+
+    @property
+    def any_counts(self) -> bytearray:
+        return self._any_counts
+
+    @property
+    def zobrist_hash(self) -> int:
+        """A 64-bit hash of the board, kept up to date by the setters.
+
+        Boards with the same size, tiles and lines always share a hash, even
+        across processes.
+        """
+        return self._hash
+
     def reset(self, width: int, height: int) -> None:
         assert width > 0 and height > 0
         self._width = width
         self._height = height
-        self._tiles = [[TileType.ANY for _y in range(height)] for _x in range(width)]
-        self._hlines = [
-            [LineState.ANY for _y in range(height)] for _x in range(width - 1)
-        ]
-        self._vlines = [
-            [LineState.ANY for _y in range(height - 1)] for _x in range(width)
-        ]
+        self._tiles = bytearray([TileType.ANY.value]) * (width * height)
+        self._hlines = bytearray([LineState.ANY.value]) * ((width - 1) * height)
+        self._vlines = bytearray([LineState.ANY.value]) * (width * (height - 1))
+        self._count_lines()
+        self._rehash()
+        if self._trail is not None:
+            self._trail = []
 
     def apply(self, state: "PuzzleState") -> None:
-        self.reset(state.width, state.height)
-        for y in range(state.height):
-            for x in range(state.width):
-                tile = state.get_tile(x, y)
-                assert tile is not None
-                self.set_tile(x, y, tile)
-        for y in range(state.height):
-            for x in range(state.width - 1):
-                hline = state.get_hline(x, y)
-                assert hline is not None
-                self.set_hline(x, y, hline)
-        for y in range(state.height - 1):
-            for x in range(state.width):
-                vline = state.get_vline(x, y)
-                assert vline is not None
-                self.set_vline(x, y, vline)
+        self.restore(state.snapshot())
+
+    def snapshot(self) -> PuzzleSnapshot:
+        return PuzzleSnapshot(
+            width=self._width,
+            height=self._height,
+            tiles=bytes(self._tiles),
+            hlines=bytes(self._hlines),
+            vlines=bytes(self._vlines),
+        )
+
+    def restore(self, snapshot: PuzzleSnapshot) -> None:
+        self._width = snapshot.width
+        self._height = snapshot.height
+        self._tiles[:] = snapshot.tiles
+        self._hlines[:] = snapshot.hlines
+        self._vlines[:] = snapshot.vlines
+        self._count_lines()
+        self._rehash()
+        if self._trail is not None:
+            self._trail = []
+
+    def begin_trail(self) -> None:
+        self._trail = []
+
+    def end_trail(self) -> None:
+        self._trail = None
+
+    @property
+    def trail(self) -> typing.Sequence[TrailEntry]:
+        assert self._trail is not None
+        return self._trail
+
+    @property
+    def trail_length(self) -> int:
+        assert self._trail is not None
+        return len(self._trail)
+
+    def undo(self, trail_length: int) -> None:
+        trail = self._trail
+        assert trail is not None and trail_length <= len(trail)
+        # Detach the trail so the setters don't record the undo itself
+        self._trail = None
+        while len(trail) > trail_length:
+            horizontal, x, y, state = trail.pop()
+            if horizontal:
+                self.set_hline(x, y, state)
+            else:
+                self.set_vline(x, y, state)
+        self._trail = trail
+
+    def _count_lines(self) -> None:
+        width = self._width
+        self._line_counts = bytearray(width * self._height)
+        self._any_counts = bytearray(width * self._height)
+        for i, code in enumerate(self._hlines):
+            v = i + i // (width - 1)
+            self._count_line(v, 0, code)
+            self._count_line(v + 1, 0, code)
+        for v, code in enumerate(self._vlines):
+            self._count_line(v, 0, code)
+            self._count_line(v + width, 0, code)
+
+    def _rehash(self) -> None:
+        keys = _zobrist_keys(self._width, self._height)
+        self._keys = keys
+        self._hash = keys.size
+        for i, code in enumerate(self._tiles):
+            self._hash ^= keys.tiles[4 * i + code]
+        for i, code in enumerate(self._hlines):
+            self._hash ^= keys.hlines[4 * i + code]
+        for i, code in enumerate(self._vlines):
+            self._hash ^= keys.vlines[4 * i + code]
+
+    def _count_line(self, v: int, previous: int, code: int) -> None:
+        # Moves one line around vertex v from the previous state to the new one
+        if previous == _LINE:
+            self._line_counts[v] -= 1
+        elif previous == _ANY:
+            self._any_counts[v] -= 1
+        if code == _LINE:
+            self._line_counts[v] += 1
+        elif code == _ANY:
+            self._any_counts[v] += 1
 
     def get_tile(self, x: int, y: int) -> typing.Optional[TileType]:
-        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+        if x < 0 or x >= self._width or y < 0 or y >= self._height:
             return None
 
-        return self._tiles[x][y]
+        return _TILE_TYPES[self._tiles[y * self._width + x]]
 
     def set_tile(self, x: int, y: int, tile: TileType) -> None:
-        assert x >= 0 and x < self.width and y >= 0 and y < self.height
-        self._tiles[x][y] = tile
+        assert x >= 0 and x < self._width and y >= 0 and y < self._height
+        i = y * self._width + x
+        tiles = self._keys.tiles
+        self._hash ^= tiles[4 * i + self._tiles[i]] ^ tiles[4 * i + tile.value]
+        self._tiles[i] = tile.value
 
     def get_hline(self, x: int, y: int) -> typing.Optional[LineState]:
-        if x < 0 or x >= self.width - 1 or y < 0 or y >= self.height:
+        if x < 0 or x >= self._width - 1 or y < 0 or y >= self._height:
             return None
 
-        return self._hlines[x][y]
+        return _LINE_STATES[self._hlines[y * (self._width - 1) + x]]
 
     def set_hline(self, x: int, y: int, state: LineState) -> None:
-        assert x >= 0 and x < self.width - 1 and y >= 0 and y < self.height
-        self._hlines[x][y] = state
+        assert x >= 0 and x < self._width - 1 and y >= 0 and y < self._height
+        i = y * (self._width - 1) + x
+        previous = self._hlines[i]
+        if self._trail is not None:
+            previous_state = _LINE_STATES[previous]
+            assert previous_state is not None
+            self._trail.append((True, x, y, previous_state))
+        self._hlines[i] = state.value
+        if previous != state.value:
+            hlines = self._keys.hlines
+            self._hash ^= hlines[4 * i + previous] ^ hlines[4 * i + state.value]
+            v = y * self._width + x
+            self._count_line(v, previous, state.value)
+            self._count_line(v + 1, previous, state.value)
 
     def get_vline(self, x: int, y: int) -> typing.Optional[LineState]:
-        if x < 0 or x >= self.width or y < 0 or y >= self.height - 1:
+        if x < 0 or x >= self._width or y < 0 or y >= self._height - 1:
             return None
 
-        return self._vlines[x][y]
+        return _LINE_STATES[self._vlines[y * self._width + x]]
 
     def set_vline(self, x: int, y: int, state: LineState) -> None:
-        assert x >= 0 and x < self.width and y >= 0 and y < self.height - 1
-        self._vlines[x][y] = state
+        assert x >= 0 and x < self._width and y >= 0 and y < self._height - 1
+        i = y * self._width + x
+        previous = self._vlines[i]
+        if self._trail is not None:
+            previous_state = _LINE_STATES[previous]
+            assert previous_state is not None
+            self._trail.append((False, x, y, previous_state))
+        self._vlines[i] = state.value
+        if previous != state.value:
+            vlines = self._keys.vlines
+            self._hash ^= vlines[4 * i + previous] ^ vlines[4 * i + state.value]
+            self._count_line(i, previous, state.value)
+            self._count_line(i + self._width, previous, state.value)
@@ -43,6 +43,34 @@ class _PublishingPuzzle(model.PuzzleState):
         super().apply(state)
         self.delay = True
 
+    def undo(self, trail_length: int) -> None:
+        self.delay = False
+        super().undo(trail_length)
+        self.delay = True
+
+    def restore(self, snapshot: model.PuzzleSnapshot) -> None:
+        if not self.publishing:
+            super().restore(snapshot)
+            return
+
+        # Restoring copies whole buffers, so publish only the lines that changed
+        previous = self.snapshot()
+        super().restore(snapshot)
+        for y in range(self.height):
+            for x in range(self.width - 1):
+                i = y * (self.width - 1) + x
+                if previous.hlines[i] != snapshot.hlines[i]:
+                    state = self.get_hline(x, y)
+                    assert state is not None
+                    self._publisher.send(messaging.UpdateHLine(x=x, y=y, state=state))
+        for y in range(self.height - 1):
+            for x in range(self.width):
+                i = y * self.width + x
+                if previous.vlines[i] != snapshot.vlines[i]:
+                    state = self.get_vline(x, y)
+                    assert state is not None
+                    self._publisher.send(messaging.UpdateVLine(x=x, y=y, state=state))
+
     def _delay(self) -> None:
         if self.delay and _DELAY > 0:
             time.sleep(_DELAY)
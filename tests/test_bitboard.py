@@ -0,0 +1,82 @@
+import random
+import pytest
+from solver import model
+from solver.algorithm import bitboard, positions, validator, vertex
+
+
+_RULES = (vertex.FillEmptyEdgesVS, vertex.OnlyLineOptionVS, vertex.DeadEndVS)
+
+
+def _random_board(rng: random.Random) -> model.PuzzleState:
+    width = rng.randint(1, 8)
+    height = rng.randint(2, 8) if width == 1 else rng.randint(1, 8)
+    puzzle_state = model.PuzzleState(width, height)
+    for _ in range(rng.randint(0, width * height // 3)):
+        puzzle_state.set_tile(
+            rng.randrange(width),
+            rng.randrange(height),
+            rng.choice(list(model.TileType)),
+        )
+    states = [model.LineState.LINE, model.LineState.EMPTY]
+    for _ in range(rng.randint(0, width * height)):
+        if height == 1 or (width > 1 and rng.random() < 0.5):
+            puzzle_state.set_hline(
+                rng.randrange(width - 1), rng.randrange(height), rng.choice(states)
+            )
+        else:
+            puzzle_state.set_vline(
+                rng.randrange(width), rng.randrange(height - 1), rng.choice(states)
+            )
+    return puzzle_state
+
+
+def _apply_rules(puzzle_state: model.PuzzleState) -> None:
+    # Runs the rules the sweep stands for on one vertex at a time, until none
+    # of them sets another line
+    rules = [rule(puzzle_state=puzzle_state) for rule in _RULES]
+    changed = True
+    while changed:
+        changed = False
+        for y in range(puzzle_state.height):
+            for x in range(puzzle_state.width):
+                v = positions.Vertex(puzzle_state=puzzle_state, x=x, y=y)
+                for rule in rules:
+                    if len(rule.make_updates(v)) > 0:
+                        changed = True
+                        break
+
+
+def _has_invalid_vertex(puzzle_state: model.PuzzleState) -> bool:
+    solution_validator = validator.SolutionValidator(puzzle_state=puzzle_state)
+    return any(
+        solution_validator.validate_vertex(x, y) == validator.SolutionValue.INVALID
+        for y in range(puzzle_state.height)
+        for x in range(puzzle_state.width)
+    )
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_sweep_matches_vertex_rules(seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(500):
+        puzzle_state = _random_board(rng)
+        expected = model.PuzzleState(1, 1)
+        expected.restore(puzzle_state.snapshot())
+        _apply_rules(expected)
+
+        swept = bitboard.Bitboard.from_state(puzzle_state).sweep()
+        if swept is None:
+            assert _has_invalid_vertex(expected)
+            continue
+
+        for (horizontal, x, y, state), _ in swept:
+            if horizontal:
+                assert puzzle_state.get_hline(x, y) == model.LineState.ANY
+                puzzle_state.set_hline(x, y, state)
+            else:
+                assert puzzle_state.get_vline(x, y) == model.LineState.ANY
+                puzzle_state.set_vline(x, y, state)
+        # Once a vertex is broken, the rules and the sweep can stop at
+        # different points
+        if not _has_invalid_vertex(expected):
+            assert puzzle_state.snapshot() == expected.snapshot()
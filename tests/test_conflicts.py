@@ -0,0 +1,79 @@
+import typing
+from solver import model
+from solver.algorithm import conflicts
+
+
+_LINE = model.LineState.LINE
+_EMPTY = model.LineState.EMPTY
+
+
+def _store(
+    puzzle_state: model.PuzzleState,
+) -> typing.Tuple[conflicts.LineReasons, conflicts.NogoodStore]:
+    reasons = conflicts.LineReasons(puzzle_state=puzzle_state)
+    reasons.load()
+    puzzle_state.begin_trail()
+    return reasons, conflicts.NogoodStore(puzzle_state=puzzle_state, reasons=reasons)
+
+
+def _guess(
+    puzzle_state: model.PuzzleState,
+    reasons: conflicts.LineReasons,
+    literal: conflicts.Literal,
+    level: int,
+) -> None:
+    horizontal, x, y, state = literal
+    trail_start = puzzle_state.trail_length
+    if horizontal:
+        puzzle_state.set_hline(x, y, state)
+    else:
+        puzzle_state.set_vline(x, y, state)
+    reasons.record_levels(trail_start, 1 << level)
+
+
+def test_nogood_refutes_the_last_literal_left() -> None:
+    puzzle_state = model.PuzzleState(4, 4)
+    reasons, nogoods = _store(puzzle_state)
+    first = (True, 0, 0, _LINE)
+    second = (False, 2, 1, _EMPTY)
+    third = (True, 1, 3, _LINE)
+    nogoods.add((first, second, third))
+
+    _guess(puzzle_state, reasons, first, 0)
+    assert nogoods.refutes(third) is None
+    trail_length = puzzle_state.trail_length
+    _guess(puzzle_state, reasons, second, 2)
+    # Blamed on the levels the rest of the nogood depends on
+    assert nogoods.refutes(third) == 0b101
+    assert nogoods.refutes((True, 1, 3, _EMPTY)) is None
+
+    puzzle_state.undo(trail_length)
+    assert nogoods.refutes(third) is None
+    _guess(puzzle_state, reasons, (False, 2, 1, _LINE), 1)
+    assert nogoods.refutes(third) is None
+
+
+def test_nogoods_over_the_size_limit_are_dropped() -> None:
+    puzzle_state = model.PuzzleState(5, 5)
+    reasons, nogoods = _store(puzzle_state)
+    literals = [(True, x, y, _LINE) for y in range(3) for x in range(4)]
+    nogoods.add(tuple(literals[:10]))
+    for i, literal in enumerate(literals[:9]):
+        _guess(puzzle_state, reasons, literal, i)
+    assert nogoods.refutes(literals[9]) is None
+
+
+def test_lines_set_around_a_vertex_depend_on_its_neighbourhood() -> None:
+    puzzle_state = model.PuzzleState(7, 7)
+    reasons, _ = _store(puzzle_state)
+    # Lines touching vertices two steps from (3, 3), and one that doesn't
+    _guess(puzzle_state, reasons, (True, 4, 3, _LINE), 0)
+    _guess(puzzle_state, reasons, (False, 3, 0, _EMPTY), 1)
+    _guess(puzzle_state, reasons, (True, 0, 0, _LINE), 2)
+    assert reasons.around(3, 3) == 0b011
+
+    trail_start = puzzle_state.trail_length
+    puzzle_state.set_vline(3, 3, _LINE)
+    reasons.record_around(trail_start, 3, 3)
+    assert reasons.of(False, 3, 3) == 0b011
+    assert reasons.of(False, 3, 4) == 0
@@ -0,0 +1,193 @@
+import functools
+import random
+import typing
+import pytest
+from solver import algorithm, model
+from solver.algorithm import connectivity, heuristics, worklist
+
+
+_Vertex = typing.Tuple[int, int]
+_Loop = typing.FrozenSet[connectivity.Edge]
+
+_SIZES = [(3, 3), (4, 3), (3, 4), (4, 4), (5, 3)]
+
+_CONFIGS = {
+    "default": {},
+    "segment_end": {"heuristic": heuristics.SegmentEndGH},
+    "pearl_first": {"heuristic": heuristics.PearlFirstGH},
+    "most_constrained": {"heuristic": heuristics.MostConstrainedGH},
+    "empty_first": {"heuristic": heuristics.EmptyFirstTilePriorityGH},
+    "seeded": {"seed": 1},
+    "probing": {"probe_budget": 200},
+    "sweep": {"sweep": True},
+    "pattern_table": {"pattern_table": True},
+    "pearls_first": {"work_policy": worklist.WorkPolicy.PEARLS_FIRST},
+}
+
+
+@functools.cache
+def _loops(width: int, height: int) -> typing.Tuple[_Loop, ...]:
+    """Every cycle of the grid, each found once from its lowest vertex."""
+
+    def index(v: _Vertex) -> int:
+        return v[1] * width + v[0]
+
+    def neighbours(v: _Vertex) -> list[_Vertex]:
+        x, y = v
+        candidates = [(x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)]
+        return [(a, b) for a, b in candidates if 0 <= a < width and 0 <= b < height]
+
+    def edge(a: _Vertex, b: _Vertex) -> connectivity.Edge:
+        if a[1] == b[1]:
+            return (True, min(a[0], b[0]), a[1])
+        return (False, a[0], min(a[1], b[1]))
+
+    loops: list[_Loop] = []
+
+    def extend(path: list[_Vertex]) -> None:
+        start = path[0]
+        for n in neighbours(path[-1]):
+            if n == start:
+                # Each loop is walked both ways, so keep only one of them
+                if len(path) >= 4 and index(path[1]) < index(path[-1]):
+                    loops.append(
+                        frozenset(edge(a, b) for a, b in zip(path, path[1:] + [start]))
+                    )
+            elif index(n) > index(start) and n not in path:
+                extend(path + [n])
+
+    for y in range(height):
+        for x in range(width):
+            extend([(x, y)])
+    return tuple(loops)
+
+
+def _with_loop(
+    width: int, height: int, tiles: dict[_Vertex, model.TileType], loop: _Loop
+) -> model.PuzzleState:
+    puzzle_state = model.PuzzleState(width, height)
+    for (x, y), tile in tiles.items():
+        puzzle_state.set_tile(x, y, tile)
+    for y in range(height):
+        for x in range(width - 1):
+            line = model.LineState.LINE if (True, x, y) in loop else None
+            puzzle_state.set_hline(x, y, line or model.LineState.EMPTY)
+    for y in range(height - 1):
+        for x in range(width):
+            line = model.LineState.LINE if (False, x, y) in loop else None
+            puzzle_state.set_vline(x, y, line or model.LineState.EMPTY)
+    return puzzle_state
+
+
+def _count(width: int, height: int, tiles: dict[_Vertex, model.TileType]) -> int:
+    return sum(
+        algorithm.SolutionValidator(
+            puzzle_state=_with_loop(width, height, tiles, loop)
+        ).is_solved()
+        == algorithm.SolutionValue.SOLVED
+        for loop in _loops(width, height)
+    )
+
+
+def _puzzles(
+    seed: int, count: int
+) -> list[typing.Tuple[int, int, dict[_Vertex, model.TileType]]]:
+    # Half the puzzles take their pearls from one of the loops, so they have
+    # at least that solution. The rest have pearls anywhere
+    rng = random.Random(seed)
+    puzzles = []
+    for i in range(count):
+        width, height = rng.choice(_SIZES)
+        tiles: dict[_Vertex, model.TileType] = {}
+        if i % 2 == 0:
+            loop = _with_loop(width, height, {}, rng.choice(_loops(width, height)))
+            for _ in range(rng.randint(2, 6)):
+                x, y = rng.randrange(width), rng.randrange(height)
+                tile = _tile_on_loop(loop, x, y)
+                if tile is not None:
+                    tiles[(x, y)] = tile
+        else:
+            for _ in range(rng.randint(0, 4)):
+                tiles[(rng.randrange(width), rng.randrange(height))] = rng.choice(
+                    [model.TileType.CORNER, model.TileType.STRAIGHT]
+                )
+        puzzles.append((width, height, tiles))
+    return puzzles
+
+
+def _tile_on_loop(
+    loop: model.PuzzleState, x: int, y: int
+) -> typing.Optional[model.TileType]:
+    # The pearl the loop goes through (x, y) as, ignoring its neighbours
+    lines = [
+        loop.get_vline(x, y - 1),
+        loop.get_vline(x, y),
+        loop.get_hline(x - 1, y),
+        loop.get_hline(x, y),
+    ]
+    up, down, left, right = (line == model.LineState.LINE for line in lines)
+    if not (up or down or left or right):
+        return None
+    return model.TileType.STRAIGHT if up == down else model.TileType.CORNER
+
+
+def _state(
+    width: int, height: int, tiles: dict[_Vertex, model.TileType]
+) -> model.PuzzleState:
+    puzzle_state = model.PuzzleState(width, height)
+    for (x, y), tile in tiles.items():
+        puzzle_state.set_tile(x, y, tile)
+    return puzzle_state
+
+
+@pytest.mark.parametrize("config", _CONFIGS.values(), ids=_CONFIGS.keys())
+def test_count_solutions_matches_enumeration(config: dict[str, typing.Any]) -> None:
+    for width, height, tiles in _puzzles(seed=0, count=60):
+        expected = _count(width, height, tiles)
+        puzzle_state = _state(width, height, tiles)
+        solver = algorithm.Solver(puzzle_state=puzzle_state, **config)
+        assert solver.count_solutions(limit=len(_loops(width, height)) + 1) == expected
+        if expected > 0:
+            assert (
+                algorithm.SolutionValidator(puzzle_state=puzzle_state).is_solved()
+                == algorithm.SolutionValue.SOLVED
+            )
+
+
+def test_unique_solution_check_stops_at_limit() -> None:
+    puzzle_state = model.PuzzleState(4, 4)
+    assert algorithm.Solver(puzzle_state=puzzle_state).count_solutions() == 2
+
+
+def _solved_as_expected(
+    solution_state: algorithm.SolutionValue,
+    puzzle_state: model.PuzzleState,
+    expected: int,
+) -> bool:
+    if expected == 0:
+        return solution_state == algorithm.SolutionValue.INVALID
+    return (
+        solution_state == algorithm.SolutionValue.SOLVED
+        and algorithm.SolutionValidator(puzzle_state=puzzle_state).is_solved()
+        == algorithm.SolutionValue.SOLVED
+    )
+
+
+def test_pooled_solvers_match_enumeration() -> None:
+    # Starting pools is slow, so these only see a few puzzles
+    for width, height, tiles in _puzzles(seed=1, count=6):
+        expected = _count(width, height, tiles)
+
+        puzzle_state = _state(width, height, tiles)
+        solver = algorithm.Solver(
+            puzzle_state=puzzle_state, probe_budget=200, probe_processes=2
+        )
+        assert solver.count_solutions(limit=len(_loops(width, height)) + 1) == expected
+
+        puzzle_state = _state(width, height, tiles)
+        solution_state = algorithm.solve_parallel(puzzle_state, processes=2)
+        assert _solved_as_expected(solution_state, puzzle_state, expected)
+
+        puzzle_state = _state(width, height, tiles)
+        solution_state = algorithm.solve_portfolio(puzzle_state, processes=2)
+        assert _solved_as_expected(solution_state, puzzle_state, expected)
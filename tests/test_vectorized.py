@@ -0,0 +1,144 @@
+import random
+import typing
+import pytest
+from solver import algorithm, model
+
+numpy = pytest.importorskip("numpy")
+
+from solver.algorithm import positions, vectorized  # noqa: E402
+
+
+def _random_board(rng: random.Random) -> model.PuzzleState:
+    # Every third board is a solved loop with a few changes, so the walk
+    # around the loop gets checked too. The rest are sparse random boards
+    if rng.randrange(3) == 0:
+        width, height = rng.randint(2, 6), rng.randint(2, 6)
+        puzzle_state = model.PuzzleState(width, height)
+        algorithm.Solver(puzzle_state=puzzle_state, seed=rng.randrange(1000)).solve()
+        changes = rng.randint(0, 6)
+    else:
+        width, height = rng.randint(1, 6), rng.randint(2, 6)
+        puzzle_state = model.PuzzleState(width, height)
+        changes = rng.randint(0, width * height)
+    for _ in range(changes):
+        if rng.random() < 0.3:
+            puzzle_state.set_tile(
+                rng.randrange(width),
+                rng.randrange(height),
+                rng.choice(list(model.TileType)),
+            )
+        elif width > 1 and rng.random() < 0.5:
+            puzzle_state.set_hline(
+                rng.randrange(width - 1),
+                rng.randrange(height),
+                rng.choice(list(model.LineState)),
+            )
+        else:
+            puzzle_state.set_vline(
+                rng.randrange(width),
+                rng.randrange(height - 1),
+                rng.choice(list(model.LineState)),
+            )
+    return puzzle_state
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_vectorized_validator_matches_solution_validator(seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(300):
+        puzzle_state = _random_board(rng)
+        expected = algorithm.SolutionValidator(puzzle_state=puzzle_state)
+        vectorized_validator = vectorized.VectorizedValidator.from_state(puzzle_state)
+
+        values = vectorized_validator.validate_vertices()
+        for y in range(puzzle_state.height):
+            for x in range(puzzle_state.width):
+                assert values[y, x] == expected.validate_vertex(x, y).value
+        assert vectorized_validator.is_solved() == expected.is_solved()
+
+
+def _expected_vertex(
+    puzzle_state: model.PuzzleState, expected: algorithm.SolutionValidator
+) -> typing.Optional[typing.Tuple[int, int]]:
+    # The vertex validate_many gives for an INVALID board, unless that is a
+    # vertex off the loop
+    values = [
+        (expected.validate_vertex(x, y), (x, y))
+        for y in range(puzzle_state.height)
+        for x in range(puzzle_state.width)
+    ]
+    for wanted in (algorithm.SolutionValue.INVALID, algorithm.SolutionValue.UNSOLVED):
+        for value, vertex in values:
+            if value == wanted:
+                return vertex
+    return None
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_validate_many_matches_solution_validator(seed: int) -> None:
+    rng = random.Random(seed)
+    boards: dict[typing.Tuple[int, int], list[model.PuzzleState]] = {}
+    for _ in range(300):
+        puzzle_state = _random_board(rng)
+        boards.setdefault((puzzle_state.width, puzzle_state.height), []).append(
+            puzzle_state
+        )
+
+    for (width, height), puzzle_states in boards.items():
+        results = vectorized.validate_many(
+            _stack([p.tile_codes for p in puzzle_states], height, width),
+            _stack([p.hline_codes for p in puzzle_states], height, width - 1),
+            _stack([p.vline_codes for p in puzzle_states], height - 1, width),
+        )
+        assert len(results) == len(puzzle_states)
+        for puzzle_state, (solution_state, vertex) in zip(puzzle_states, results):
+            expected = algorithm.SolutionValidator(puzzle_state=puzzle_state)
+            assert solution_state == expected.is_solved()
+            if solution_state != algorithm.SolutionValue.INVALID:
+                assert vertex is None
+                continue
+            assert vertex is not None
+            first = _expected_vertex(puzzle_state, expected)
+            if first is not None:
+                assert vertex == first
+            else:
+                x, y = vertex
+                assert (
+                    positions.Vertex(puzzle_state=puzzle_state, x=x, y=y).count_lines
+                    > 0
+                )
+
+
+def test_validate_many_accepts_no_boards() -> None:
+    assert (
+        vectorized.validate_many(_stack([], 3, 4), _stack([], 3, 3), _stack([], 2, 4))
+        == []
+    )
+
+
+def _stack(layers: list[bytearray], height: int, width: int) -> typing.Any:
+    return numpy.frombuffer(b"".join(layers), dtype=numpy.uint8).reshape(
+        len(layers), height, width
+    )
+
+
+def test_validate_many_points_at_a_second_loop() -> None:
+    # Two squares side by side, each a loop of its own
+    puzzle_state = model.PuzzleState(5, 2)
+    for x in (0, 3):
+        puzzle_state.set_hline(x, 0, model.LineState.LINE)
+        puzzle_state.set_hline(x, 1, model.LineState.LINE)
+        puzzle_state.set_vline(x, 0, model.LineState.LINE)
+        puzzle_state.set_vline(x + 1, 0, model.LineState.LINE)
+    for x in (1, 2):
+        puzzle_state.set_hline(x, 0, model.LineState.EMPTY)
+        puzzle_state.set_hline(x, 1, model.LineState.EMPTY)
+    puzzle_state.set_vline(2, 0, model.LineState.EMPTY)
+
+    [(solution_state, vertex)] = vectorized.validate_many(
+        _stack([puzzle_state.tile_codes], 2, 5),
+        _stack([puzzle_state.hline_codes], 2, 4),
+        _stack([puzzle_state.vline_codes], 1, 5),
+    )
+    assert solution_state == algorithm.SolutionValue.INVALID
+    assert vertex == (3, 0)